@@ -11,4 +11,26 @@ RUN_ARGS = verbose debug apply
 
 publish-and-update: publish env
 	pip install -U pypi-template
-	
\ No newline at end of file
+	
+MANIFEST=pypi_template/manifest.json
+CLASSIFIERS_INDEX=pypi_template/classifiers.json
+
+manifest: $(MANIFEST) $(CLASSIFIERS_INDEX)
+$(MANIFEST):
+	python -m pypi_template.manifest
+$(CLASSIFIERS_INDEX):
+	python -m pypi_template.classifiers
+
+dist: manifest
+
+.PHONY: $(MANIFEST) $(CLASSIFIERS_INDEX)
+
+BENCHMARK_BASELINE=benchmarks/baseline.json
+
+benchmark:
+	python -m benchmarks $(if $(wildcard $(BENCHMARK_BASELINE)),--baseline=$(BENCHMARK_BASELINE)) > /dev/null
+
+benchmark-baseline:
+	python -m benchmarks --output=$(BENCHMARK_BASELINE) > /dev/null
+
+.PHONY: benchmark benchmark-baseline
@@ -0,0 +1,211 @@
+"""
+Benchmark suite for startup, template collection, rendering, apply and status.
+
+Runs each benchmark on the built-in templates and on synthetic template packs
+of increasing size, and outputs the results as JSON. Given a baseline, results
+are compared against it and regressions are reported, failing the run.
+
+  Examples of usage:
+
+      % python -m benchmarks                                  # run and report
+      % python -m benchmarks --output=benchmarks/baseline.json  # store baseline
+      % python -m benchmarks --baseline=benchmarks/baseline.json
+
+or use `make benchmark` and `make benchmark-baseline`.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+from fire import Fire
+
+from pypi_template import __version__
+
+from benchmarks            import synthetic
+from benchmarks.pypi_index import Index
+
+def measure(run, repeat, setup=None):
+  """
+  Times `repeat` runs of a function, each given the result of a fresh setup.
+  """
+  times = []
+  for _ in range(repeat):
+    state = setup() if setup else None
+    start = time.perf_counter()
+    run(state)
+    times.append(time.perf_counter() - start)
+  return {
+    "median" : statistics.median(times),
+    "min"    : min(times),
+    "runs"   : repeat
+  }
+
+class Suite():
+  def __init__(self, root, repeat):
+    self.root    = Path(root)
+    self.repeat  = repeat
+    self.results = {}
+    self._caches = 0
+
+  def cache(self, fresh=False):
+    # point the persistent cache to a fresh or the shared warm folder
+    if fresh:
+      self._caches += 1
+      folder = self.root / "caches" / str(self._caches)
+    else:
+      folder = self.root / "caches" / "warm"
+    os.environ["PYPI_TEMPLATE_CACHE"] = str(folder)
+
+  def record(self, name, size, result):
+    key = f"{name}[{size}]"
+    self.results[key] = result
+    print(f"{key:40} {result['median'] * 1000:10.2f} ms", file=sys.stderr)
+
+  def startup(self):
+    command = [ sys.executable, "-m", "pypi_template", "version" ]
+    self.record("startup", "version", measure(
+      lambda _: subprocess.run(command, check=True, capture_output=True),
+      self.repeat
+    ))
+
+  def size(self, size):
+    label     = "builtin" if size is None else size
+    pack_root = None
+    if size is not None:
+      pack_root = synthetic.pack(self.root / f"pack-{size}", size)
+    project = synthetic.project(self.root / f"project-{label}", size)
+    os.chdir(project)
+
+    def template(_=None):
+      return synthetic.template(pack_root)
+
+    def fresh(_=None):
+      self.cache(fresh=True)
+
+    def construct(_):
+      return template().variables
+
+    self.record("construct-cold", label, measure(construct, self.repeat, fresh))
+    self.cache()
+    construct(None)
+    self.record("construct-warm", label, measure(construct, self.repeat))
+
+    self.record("collect-templates", label, measure(
+      lambda t: t._collect_templates(), self.repeat, template
+    ))
+
+    template().apply()
+    def rendering(_=None):
+      t = template()
+      t._force      = True
+      t._show_debug = True
+      return t
+    self.record("render-files", label, measure(
+      lambda t: t._render_files(), self.repeat, rendering
+    ))
+
+    def empty(_=None):
+      for path in project.iterdir():
+        if path.name != ".pypi-template":
+          synthetic.clean(path) if path.is_dir() else path.unlink()
+      return template()
+    self.record("apply-full", label, measure(
+      lambda t: t.apply(), self.repeat, empty
+    ))
+    template().apply()
+    self.record("apply-unchanged", label, measure(
+      lambda t: t.apply(), self.repeat, template
+    ))
+
+  def status(self):
+    index = Index().start()
+    index.add("pypi-template", __version__)
+    os.environ["PYPI_TEMPLATE_INDEX"] = index.url
+    os.chdir(synthetic.project(self.root / "project-status"))
+    from pypi_template import PyPiTemplate
+    try:
+      def cold(_=None):
+        self.cache(fresh=True)
+        return PyPiTemplate()
+      self.record("status-cold", "builtin", measure(
+        lambda t: t.status(), self.repeat, cold
+      ))
+      self.cache()
+      PyPiTemplate().status()
+      self.record("status-warm", "builtin", measure(
+        lambda t: t.status(), self.repeat, lambda _=None: PyPiTemplate()
+      ))
+    finally:
+      index.stop()
+
+def compare(results, baseline, tolerance):
+  """
+  Returns the benchmarks that are more than `tolerance` times slower than the
+  baseline (ignoring differences below a millisecond).
+  """
+  regressions = {}
+  for key, result in results.items():
+    if key not in baseline:
+      continue
+    before = baseline[key]["median"]
+    after  = result["median"]
+    if after > before * tolerance and after - before > 0.001:
+      regressions[key] = { "baseline" : before, "current" : after }
+  return regressions
+
+def main(sizes=(100, 1000), repeat=5, output=None, baseline=None, tolerance=1.25):
+  """
+  Runs the benchmarks, optionally writing the results to `output` and
+  comparing them against a `baseline`.
+  """
+  logging.disable(logging.CRITICAL)
+  cwd         = os.getcwd()
+  environment = dict(os.environ)
+  try:
+    with tempfile.TemporaryDirectory() as root:
+      suite = Suite(root, repeat)
+      suite.startup()
+      for size in [ None, *sizes ]:
+        suite.size(size)
+      suite.status()
+      os.chdir(cwd)
+  finally:
+    logging.disable(logging.NOTSET)
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(environment)
+
+  report = {
+    "version"  : __version__,
+    "python"   : platform.python_version(),
+    "platform" : platform.platform(),
+    "results"  : suite.results
+  }
+  if output:
+    with open(output, "w") as fp:
+      json.dump(report, fp, indent=2)
+      fp.write("\n")
+  if baseline:
+    with open(baseline) as fp:
+      regressions = compare(suite.results, json.load(fp)["results"], tolerance)
+    report["regressions"] = regressions
+    for key, regression in regressions.items():
+      print(
+        f"🚨 {key} regressed: {regression['baseline'] * 1000:.2f} ms -> "
+        f"{regression['current'] * 1000:.2f} ms", file=sys.stderr
+      )
+    if regressions:
+      print(json.dumps(report, indent=2))
+      sys.exit(1)
+  return json.dumps(report, indent=2)
+
+if __name__ == "__main__":
+  Fire(main)
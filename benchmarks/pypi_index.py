@@ -0,0 +1,69 @@
+"""
+A local stand-in for the JSON API of PyPI, used by tests and benchmarks.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Index():
+  """
+  A local stand-in for the JSON API of PyPI.
+  """
+  def __init__(self):
+    self.packages = {}
+    self.requests = []
+    self.server   = None
+
+  def add(self, name, *versions):
+    self.packages[name] = list(versions)
+
+  @property
+  def url(self):
+    return f"http://127.0.0.1:{self.server.server_address[1]}/pypi"
+
+  def start(self):
+    self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+    thread = threading.Thread(
+      target=self.server.serve_forever, kwargs={ "poll_interval" : 0.05 },
+      daemon=True
+    )
+    thread.start()
+    return self
+
+  def stop(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def handler(self):
+    index = self
+
+    class Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        index.requests.append(self.path)
+        name = self.path.split("/")[2]
+        if name not in index.packages:
+          self.send_response(404)
+          self.end_headers()
+          return
+        versions = index.packages[name]
+        etag = f'"{name}-{versions[-1]}"'
+        if self.headers.get("If-None-Match") == etag:
+          self.send_response(304)
+          self.end_headers()
+          return
+        body = json.dumps({
+          "info"     : { "name" : name, "version" : versions[-1] },
+          "releases" : { version : [] for version in versions }
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def log_message(self, *args):
+        pass
+
+    return Handler
@@ -0,0 +1,100 @@
+"""
+Generators for synthetic projects and template packs of increasing size.
+"""
+
+import os
+import shutil
+from functools import cached_property
+from pathlib import Path
+
+import yaml
+
+from pypi_template import PyPiTemplate
+
+VARIABLES = 10
+CONFIG    = Path(__file__).resolve().parent.parent / ".pypi-template"
+
+TEMPLATE = """# {name}
+
+{{{{ var_{var} }}}} by {{{{ package_name }}}}
+
+{{% for dependency in requires %}}
+- {{{{ dependency }}}}
+{{% endfor %}}
+""" + "\n".join(f"filler line {line} of a generated file" for line in range(50)) + "\n"
+
+def pack(root, size):
+  """
+  Generates a template pack with `size` templates in nested folders.
+  """
+  root = Path(root)
+  for index in range(size):
+    path = root / f"folder_{index // 50}" / f"file_{index}.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(TEMPLATE.format(name=path.name, var=index % VARIABLES))
+  return root
+
+def project(root, size=None):
+  """
+  Generates a project using the built-in templates, or, given a size, the
+  variables of a synthetic template pack.
+  """
+  root = Path(root)
+  root.mkdir(parents=True, exist_ok=True)
+  if size is None:
+    config = yaml.safe_load(CONFIG.read_text())
+    config["skip"] = []
+  else:
+    config = {
+      **{ f"var_{index}" : f"value {index}" for index in range(VARIABLES) },
+      "package_name"        : "synthetic",
+      "package_module_name" : "synthetic",
+      "requires"            : [ f"dependency-{index}" for index in range(10) ],
+      "skip"                : []
+    }
+  with open(root / ".pypi-template", "w") as fp:
+    yaml.safe_dump(config, fp)
+  return root
+
+def template(pack_root=None):
+  """
+  Returns a PyPiTemplate for the current folder, using the built-in templates
+  or those in a synthetic template pack.
+  """
+  if pack_root is None:
+    return PyPiTemplate()
+  return SyntheticTemplate(pack_root)
+
+class SyntheticTemplate(PyPiTemplate):
+  """
+  A PyPiTemplate that uses a synthetic template pack instead of the built-in
+  templates.
+  """
+  _manifest = None
+
+  def __init__(self, pack_root):
+    self._pack_root = Path(pack_root)
+    super().__init__()
+
+  @cached_property
+  def _environment(self):
+    from jinja2 import Environment, FileSystemLoader
+    from pypi_template.cache import bytecode_cache
+    return Environment(
+      loader=FileSystemLoader(str(self._pack_root)),
+      bytecode_cache=bytecode_cache(),
+      keep_trailing_newline=True
+    )
+
+  def _list_resources(self):
+    return sorted(
+      os.path.relpath(os.path.join(folder, filename), self._pack_root)
+      for folder, _, filenames in os.walk(self._pack_root)
+      for filename in filenames
+    )
+
+  def _load_resource(self, *args):
+    return (self._pack_root / os.path.join(*args)).read_bytes()
+
+def clean(root):
+  shutil.rmtree(root, ignore_errors=True)
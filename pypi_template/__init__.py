@@ -3,47 +3,27 @@ __version__ = "1.5.1"
 import os
 import sys
 import datetime
-
-import importlib_resources
-
 import copy
-
-from jinja2 import Environment, PackageLoader, meta
-
 import json
-import yaml
+import contextlib
 
-from prompt_toolkit.completion import FuzzyWordCompleter
-from prompt_toolkit import prompt
-from prompt_toolkit.styles import Style
-from colorama import init, Fore
+from functools import cached_property
 
-import requests
-from packaging import version as packaging_version
-
-from pypi_template.pip  import Pip
-from pypi_template.util import file_content
-
-from rich.console import Console
-from rich.logging import RichHandler
+from pypi_template.pip   import Pip
+from pypi_template.fleet import Fleet
+from pypi_template.util import file_content, file_digest
+from pypi_template.options import Options
 
 import logging
 
-console = Console(stderr=True, record=True)
-handler = RichHandler(console=console, markup=True)
-
-FORMAT="%(message)s"
-DATEFMT="[%X]"
-logging.basicConfig(
-  level=os.environ.get("LOG_LEVEL", "INFO"),
-  format=FORMAT, datefmt=DATEFMT,
-  handlers=[handler]
-)
-
 logger = logging.getLogger(__name__)
 
-style = Style.from_dict({ "underlined": "underline" })
-init(autoreset=True)
+# files larger than this aren't diffed line by line, only reported as changed
+MAX_DIFF_SIZE = 1024 * 1024
+
+# heavy dependencies (jinja2, yaml, prompt_toolkit, colorama, requests, rich)
+# are imported lazily, in the helpers that actually need them, to keep simple,
+# read-only commands such as `version` and `variables` fast
 
 class PyPiTemplate():
 
@@ -68,76 +48,241 @@ class PyPiTemplate():
       % pypi-template yes edit all   # to edit any new variables
   """
 
-  def __init__(self):
-    # operational setup with forward looking for defaults during __init__
-    self._be_verbose     = "verbose" in sys.argv
-    self._force          = "force"   in sys.argv
-    self._show_debug     = "debug"   in sys.argv
-    self._say_yes_to_all = "yes"     in sys.argv
+  def __init__(self, root=None, options=None):
+    # the root of the project, or None for the current working directory
+    self._root = root
+
+    # operational setup, by default with forward looking on the command line
+    if options is None:
+      options = Options.from_argv(sys.argv)
+    self._be_verbose     = options.verbose
+    self._force          = options.force
+    self._show_debug     = options.debug
+    self._say_yes_to_all = options.yes
+    self._offline        = options.offline
     self._as_json        = False
+    self._workers        = options.workers  # size of the rendering thread pool
+    self._timings        = None   # per-phase timings, when enabled
+    self._events         = None   # stream of JSON events, when enabled
 
-    # setup Jinja Template Engine
-    self._environment = Environment(
-      loader=PackageLoader("pypi_template", "templates")
-    )
-    self._environment.keep_trailing_newline = True
-
-    # default, not exposed, system-style dynamic variables
-    self._system_vars = {
-      "now"                   : datetime.datetime.now().isoformat(),
-      "current_year"          : str(datetime.datetime.now().year),
-      "pypi_template_version" : __version__,
-      "summary"               : file_content("docs/summary.md")
-    }
     # substitution/template variables that are lists, not single values
+    # values are None or a function returning a completer for the choices
     self._var_lists = {
-      "classifiers"     : self._load_classifiers(),
+      "classifiers"     : self._classifier_completer,
       "requires"        : None,
       "test_requires"   : None,
       "console_scripts" : None,
       "scripts"         : None,
-      "skip"            : None
+      "skip"            : None,
+      "layers"          : None
     }
-    # key/value substitution/template variables
-    self._template_vars  = {}
 
-    # system vars that are in the .pypi-template
-    self._system_template_vars = {}
     # the actually expected system values
     self._system_template_vars_defaults = {
       "version" : __version__
     }
 
-    # all templates
-    self._templates      = {}
-
-    # tracking changes applied to _template_vars
+    # tracking changes applied to _template_vars, and the values before the
+    # first change, which are kept when the changes are saved
     self._changes        = {}
+    self._previous       = {}
+
+    # tracking files that were written or drifted, the outcome of the last
+    # status or check and the exit code of the command line tool
+    self._written        = []
+    self._drifted        = []
+    self._healthy        = None
+    self._exit_code      = 0
+
+    # everything else (Jinja environment, system variables, saved variables,
+    # personal default values, templates and the variables used in them) is
+    # loaded lazily, on first use, by the cached properties below
+
+    # set up submodules to handle groups of commands
+    self.pip   = Pip(self)
+    self.fleet = Fleet(self)
+
+  # lazily initialized state
+
+  @cached_property
+  def _environment(self):
+    from jinja2 import Environment, PackageLoader, ChoiceLoader
+    from pypi_template.cache import bytecode_cache
+    loader = PackageLoader("pypi_template", "templates")
+    if self._layers:
+      # later layers override earlier ones
+      loader = ChoiceLoader(
+        [ layer.loader() for layer in reversed(self._layers) ] + [ loader ]
+      )
+    environment = Environment(loader=loader, bytecode_cache=bytecode_cache())
+    environment.keep_trailing_newline = True
+    return environment
+
+  @cached_property
+  def _system_vars(self):
+    # default, not exposed, system-style dynamic variables
+    now = datetime.datetime.now()
+    return {
+      "now"                   : now.isoformat(),
+      "current_year"          : str(now.year),
+      "pypi_template_version" : __version__,
+      "summary"               : file_content("docs/summary.md", root=self._root)
+    }
 
-    # default default values
-    self._default_values = {
+  @cached_property
+  def _default_values(self):
+    # default default values, updated with organisation-wide and personal ones
+    default_values = {
       "readme"                    : ".github/README.md",
-      "first_year_of_publication" : self._system_vars["current_year"],
-      "project_env"               : file_content(".python_version", default="")
+      "first_year_of_publication" : str(datetime.datetime.now().year),
+      "project_env"               : file_content(".python_version", default="", root=self._root)
+    }
+    self._load_personal_default_values(default_values)
+    return default_values
+
+  @cached_property
+  def _config(self):
+    # saved variables (from .pypi-template)
+    return self._load_vars()
+
+  @cached_property
+  def _system_template_vars(self):
+    # system vars that are in the .pypi-template
+    return {
+      key : self._config.get(key, None)
+      for key in self._system_template_vars_defaults
     }
 
-    # load personal default values, saved variables (from .pypi-template)
-    # and discover all templates and variables that have been used on them
-    self._load_personal_default_values()
-    self._load_vars()
+  @cached_property
+  def _template_vars(self):
+    # key/value substitution/template variables, extended with all variables
+    # that are used in the templates
+    template_vars = {
+      key : value for key, value in self._config.items()
+      if key not in self._system_template_vars_defaults
+    }
     # skip isn't anywhere in the templates and isn't collected and therefore
     # reported as missing after init - adding it manually for now
-    if "skip" not in self._template_vars:
-      self._template_vars["skip"] = []
-    self._collect_templates()
+    if "skip" not in template_vars:
+      template_vars["skip"] = []
+    # idem for the optional additional template layers
+    if "layers" not in template_vars:
+      template_vars["layers"] = []
+    for name, variables in self._template_variables.items():
+      for var in variables:
+        self._debugging(f"🔎 found variable in {name} : {var}")
+        if var not in template_vars and var not in self._system_vars:
+          template_vars[var] = None
+    return template_vars
+
+  @cached_property
+  def _layers(self):
+    # additional template layers, on top of the built-in templates
+    from pypi_template.layers import Layer, from_environment
+    specs = from_environment() + \
+            (self._default_values.get("layers", None) or []) + \
+            (self._config.get("layers", None) or [])
+    layers = []
+    for spec in dict.fromkeys(specs):
+      try:
+        layer = Layer(spec, root=self._root)
+      except ImportError as e:
+        logger.warning(f"🚨 unknown template layer {spec}: {e}")
+        continue
+      if not layer.root.is_dir():
+        logger.warning(f"🚨 template layer {spec} isn't a folder")
+        continue
+      self._debugging(f"📚 using template layer {spec}")
+      layers.append(layer)
+    return layers
+
+  @cached_property
+  def _template_info(self):
+    # resource, content digest, used variables and referenced templates of
+    # each template
+    return self._discover_templates()
+
+  @cached_property
+  def _template_variables(self):
+    # all variables that are used in each template
+    return {
+      name : set(info["variables"]) for name, info in self._template_info.items()
+    }
 
-    # set up submodules to handle groups of commands
-    self.pip = Pip(self)
+  @cached_property
+  def _template_dependencies(self):
+    # each template and all the templates it (indirectly) references
+    by_resource = {
+      info["resource"] : name for name, info in self._template_info.items()
+    }
+    dependencies = {}
+    for name in self._template_info:
+      found = []
+      todo  = [ name ]
+      while todo:
+        current = todo.pop()
+        if current in found or current not in self._template_info:
+          continue
+        found.append(current)
+        todo += [
+          by_resource.get(reference, reference)
+          for reference in self._template_info[current]["references"]
+        ]
+      dependencies[name] = found
+    return dependencies
+
+  @cached_property
+  def _template_digests(self):
+    # a digest of each template, including the templates it references
+    from pypi_template.cache import digest
+    return {
+      name : digest("".join(
+        self._template_info[dependency]["digest"] for dependency in dependencies
+      ))
+      for name, dependencies in self._template_dependencies.items()
+    }
+
+  @cached_property
+  def _variable_templates(self):
+    # reverse index: each variable and the templates that (indirectly) use it
+    index = {}
+    for name, dependencies in self._template_dependencies.items():
+      for dependency in dependencies:
+        for var in self._template_variables[dependency]:
+          index.setdefault(var, set()).add(name)
+      # the name of some templates also depends on a variable
+      if "(package_module_name)" in name:
+        index.setdefault("package_module_name", set()).add(name)
+    return index
+
+  @cached_property
+  def _classifier_index(self):
+    from pypi_template.classifiers import ClassifierIndex
+    return ClassifierIndex.load()
+
+  @cached_property
+  def _pypi(self):
+    from pypi_template.pypi import PyPI
+    return PyPI(offline=self._offline)
+
+  @cached_property
+  def _manifest(self):
+    # the build-time manifest of templates, or None when running from a
+    # checkout without an up to date one
+    from pypi_template.manifest import load
+    with self._timed("load-manifest"):
+      return load()
+
+  @cached_property
+  def _templates(self):
+    # all templates
+    return self._collect_templates()
 
   # fire default output - if there are unapplied changes, notify them when
   # exiting - and thus losing them
   def __str__(self):
     if self._changes:
+      import yaml
       return f"unapplied changes:\n{yaml.dump(self._changes)}"
     else:
       return ""
@@ -180,6 +325,30 @@ class PyPiTemplate():
     self._as_json = True
     return self
 
+  def timings(self, profile=None):
+    """
+    Measure the duration of each phase and template and report them as JSON
+    at the end. Optionally write a cProfile dump to a file. (chainable)
+    """
+    from pypi_template.timings import Timings
+    self._timings = Timings(profile=profile)
+    return self
+
+  def events(self):
+    """
+    Stream what happens as JSON events, one per line, on stdout. (chainable)
+    """
+    from pypi_template.events import Events
+    self._events = Events()
+    return self
+
+  def offline(self):
+    """
+    Don't access the network, only use cached information. (chainable)
+    """
+    self._offline = True
+    return self
+
   # values
 
   @property
@@ -209,6 +378,13 @@ class PyPiTemplate():
     """
     return self._out(self._default_values)
 
+  def classifiers(self, query="", level=None):
+    """
+    Return all available classifiers, matching the words in an optional query
+    and/or at a given level in the hierarchy, e.g. `classifiers python --level=3`.
+    """
+    return self._out(self._classifier_index.search(query, level=level))
+
   @property
   def uninitialized(self):
     """
@@ -232,8 +408,12 @@ class PyPiTemplate():
     """
     self.edit("all")
     self.apply()
-    if self._going_to("👷‍♂️ performing post-init install (e.g. environments)"):
-      self._make("install")
+    if self._going_to("👷‍♂️ provisioning environments"):
+      self._provision_environments()
+      # the project environment itself isn't provisioned
+      logger.info("👉 to activate the project environment and install its tooling")
+      logger.info("   issue 'make env' and "
+                  "'pip install -U pip pypi-template wheel twine setuptools build'")
 
   def edit(self, variable):
     """
@@ -248,7 +428,7 @@ class PyPiTemplate():
 
   def ignore(self, target):
     """
-    Add a target to the list of skipped paths (folders recursively) (chainable)
+    Add a target to the list of skipped paths (gitignore syntax) (chainable)
     """
     self._being_verbose(f"🔎 ignoring {target}")
     self._append("skip", target)
@@ -261,46 +441,218 @@ class PyPiTemplate():
     self.save()
     self._render_files()
 
+  def serve(self, socket=None):
+    """
+    Run a daemon that keeps templates warm and handles the `status`,
+    `variables`, `apply`, `diff`, `check` and `classifiers` commands of other
+    calls.
+    """
+    import signal
+    from pypi_template.daemon import Daemon, socket_path
+    path = socket or socket_path()
+    if path is None:
+      logger.error("🛑 no socket to listen on, set PYPI_TEMPLATE_SOCKET")
+      return
+    try:
+      daemon = Daemon(path)
+    except (RuntimeError, OSError) as e:
+      logger.error(f"🛑 can't start daemon: {e}")
+      return
+    def stop(signum, frame):
+      raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    with daemon:
+      logger.info(f"👂 listening on {path}")
+      try:
+        daemon.serve_forever()
+      except KeyboardInterrupt:
+        pass
+
+  def watch(self, debounce=0.2, interval=None, limit=None):
+    """
+    Apply, and apply again whenever the configuration, `docs/summary.md` or any
+    template layer changes, only re-rendering affected files. Give an
+    `--interval` to poll for changes instead of using inotify.
+    """
+    from pypi_template.watch import inputs, watcher
+    project = self
+    handled = 0
+    try:
+      while True:
+        files, folders = inputs(project)
+        with watcher(files, folders, interval) as changes:
+          project.apply()
+          # don't pick up the configuration that was just saved
+          changes.settle([ os.path.abspath(project._path(".pypi-template")) ])
+          if limit is not None and handled >= limit:
+            return
+          logger.info(f"👀 watching {len(files)} files and {len(folders)} layers")
+          changed = changes.changes(debounce)
+        for path in sorted(changed):
+          logger.info(f"🔄 {os.path.relpath(path)} changed")
+        handled += 1
+        project = self._fresh()
+    except KeyboardInterrupt:
+      pass
+
+  def diff(self):
+    """
+    Show what `apply` would change, as a unified diff per file, without writing.
+    """
+    for filename, state, lines in self._diff_files():
+      if self._as_json:
+        yield json.dumps({
+          "filename" : filename,
+          "state"    : state,
+          "diff"     : "".join(lines)
+        })
+      else:
+        for line in lines:
+          yield line.rstrip("\n")
+
   def save(self):
     """
     Save the current set of variables to `.pypi-template` (chainable)
     """
     if self._changes or self._force:
       if self._going_to("💾 saving variables"):
-        with open(".pypi-template", "w", encoding="utf-8") as outfile:
-          yaml.safe_dump(
-            {**self._template_vars, **self._system_template_vars_defaults},
-            outfile, default_flow_style=False
-          )
+        from pypi_template import config
+        config.save(
+          {**self._template_vars, **self._system_template_vars_defaults},
+          self._path(".pypi-template")
+        )
       self._changes = {}
     return self
 
+  def check(self):
+    """
+    Check that all generated files are up to date, without writing anything,
+    e.g. in CI or a pre-commit hook. Exits with a non-zero code and lists the
+    files that drifted. Use `force check` to ignore the lock.
+    """
+    drifted = self._drifted_files()
+    for filename, state in drifted:
+      logger.error(f"🚨 {filename} is {'missing' if state == 'new' else 'out of date'}")
+      self._emit("check-failed", check="drift", filename=filename, state=state)
+    self._drifted = [ filename for filename, _ in drifted ]
+    self._healthy = not drifted
+    if drifted:
+      logger.error("   👉 issue 'apply' to fix!")
+      self._exit_code = 1
+    else:
+      self._being_verbose("😎 all generated files are up to date")
+    return self._result("check", self._drifted)
+
+  def sync(self, workers=None, backend=None):
+    """
+    Sync the run, docs and test environments with `requires` and
+    `test_requires`, only installing and uninstalling what changed.
+    """
+    return self._result("sync", self._sync_environments(workers, backend))
+
+  def provision(self, workers=None, backend=None):
+    """
+    Create the run, docs and test environments, concurrently, and install their
+    requirements, using a shared cache of wheels. Optionally use another
+    backend: pyenv (default), venv, uv or `<module>:<class>`.
+    """
+    return self._result("provision", self._provision_environments(workers, backend))
+
   def status(self):
     """
     Perform a few sanity checks (chainable)
     """
-    if all([
-      self._check_pypi_version(),
-      self._check_uninitialized_variables(),
-      self._check_config_version()
-    ]):
+    from concurrent.futures import ThreadPoolExecutor
+    # load the configuration once, before checking concurrently
+    self._preload("_template_vars", "_system_template_vars")
+    checks = [
+      self._check_pypi_version,
+      self._check_uninitialized_variables,
+      self._check_config_version
+    ]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+      self._healthy = all(list(executor.map(lambda check: check(), checks)))
+    if self._healthy:
       logger.info("😎 everything is OK")
+    # keep stdout NDJSON-only when streaming events
+    if self._events:
+      return self._result("status", self._healthy)
     return self
 
   # helper functions
 
-  def _make(self, target):
-    # TODO look further into why pyenv fails to adopt correct virtualenv
-    # subprocess.run(["make", target])
-    print(f"👉 please execute `make {target}` manually...")
+  def _preload(self, *attributes):
+    # initializes lazily initialized state up front, e.g. before it is used by
+    # many threads, or to fill the persistent caches
+    for attribute in attributes:
+      getattr(self, attribute)
+
+  def _sync_environments(self, workers=None, backend=None):
+    from pypi_template import envs
+    environments = envs.discover(
+      envs.backend(backend, root=self._root),
+      self["requires"] or [], self["test_requires"] or [],
+      envs.requirements_file("requirements.docs.txt", root=self._root),
+      previous=self._previous_requirements(), root=self._root
+    )
+    if not environments:
+      logger.warning("🚨 no environments to sync")
+      logger.warning("   👉 issue 'make install' to create them")
+      return []
+    self._being_verbose(f"👷‍♂️ syncing {len(environments)} environments")
+    results = envs.sync(environments, workers=workers or self._workers)
+    for result in results:
+      for dep in result["uninstalled"]:
+        self._being_verbose(f"   ❌ {result['environment']}: uninstalled {dep}")
+      for dep in result["installed"]:
+        self._being_verbose(f"   ➕ {result['environment']}: installed {dep}")
+    return results
+
+  def _previous_requirements(self):
+    # the requirements before they were changed, in this run or since the last
+    # apply, to also uninstall removed ones from environments without a state
+    from pypi_template.lock import Lock
+    lock     = Lock.load(root=self._root)
+    previous = {}
+    for scope in [ "requires", "test_requires" ]:
+      previous[scope] = list(self._previous.get(scope, None) or [])
+      if lock:
+        previous[scope] += list(lock.variables.get(scope, None) or [])
+    return previous
+
+  def _provision_environments(self, workers=None, backend=None):
+    from pypi_template import envs
+    from pypi_template.cache import cache_dir
+    environments = envs.environments(
+      envs.backend(backend, root=self._root),
+      self["requires"] or [], self["test_requires"] or [],
+      envs.requirements_file("requirements.docs.txt", root=self._root),
+      root=self._root
+    )
+    self._being_verbose(f"👷‍♂️ provisioning {len(environments)} environments")
+    wheels  = cache_dir() / "wheels" if cache_dir() else None
+    results = envs.provision(environments, wheels=wheels, workers=workers or self._workers)
+    for result in results:
+      if result["created"]:
+        self._being_verbose(f"   🐍 created {result['environment']}")
+      for dep in result["installed"]:
+        self._being_verbose(f"   ➕ {result['environment']}: installed {dep}")
+    return results
 
   def _check_pypi_version(self):
     # notify of newer version
-    response = requests.get("https://pypi.org/pypi/pypi-template/json")
-    latest_version = response.json()["info"]["version"]
-    if packaging_version.parse(self.version) < packaging_version.parse(latest_version):
+    from packaging import version as packaging_version
+    from pypi_template.pypi import Offline
+    try:
+      with self._timed("check-pypi"):
+        latest_version = self._pypi.latest_version("pypi-template")
+    except Offline as e:
+      logger.warning(f"🔌 can't check for a newer version of pypi-template: {e}")
+      return True
+    if packaging_version.parse(__version__) < packaging_version.parse(latest_version):
       logger.warning(f"🚨 a newer version of pypi-template ({latest_version}) is available")
       logger.warning( "   👉 issue 'pip install -U pypi-template' to upgrade!")
+      self._emit("check-failed", check="pypi-version", latest=latest_version)
       return False
     return True
 
@@ -310,6 +662,7 @@ class PyPiTemplate():
       plural = "s" if len(self.uninitialized) > 1 else ""
       logger.warning(f"🚨 uninitialized template variable{plural}: {', '.join(self.uninitialized)}")
       logger.warning( "   👉 issue 'yes edit all apply' to fix!")
+      self._emit("check-failed", check="uninitialized", variables=self.uninitialized)
       return False
     return True
 
@@ -319,6 +672,7 @@ class PyPiTemplate():
     if config_version != self.version:
       logger.warning(f"🚨 pypi-template config version {config_version} != {self.version}")
       logger.warning( "   👉 issue 'force save' to update!")
+      self._emit("check-failed", check="config-version", version=config_version)
       return False
     return True
 
@@ -336,6 +690,7 @@ class PyPiTemplate():
     if value != current:
       self._debugging(f"👉 recording change {current} -> {value}")
       self._template_vars[var] = value
+      self._previous.setdefault(var, current)
       self._changes[var] = {
         "old" : current,
         "new" : value
@@ -347,40 +702,84 @@ class PyPiTemplate():
   # variables helpers
 
   def _load_vars(self):
+    # system_template_vars are also in the config, but aren't real (template)
+    # vars and are extracted from it by _system_template_vars
+    from pypi_template.config import load
+    config = {}
     try:
-      with open(".pypi-template", encoding="utf-8") as fp:
-        self._template_vars = yaml.safe_load(fp)
+      with self._timed("load-config") as sample:
+        config = load(self._path(".pypi-template"), sample)
       self._debugging("💾 loaded .pypy-template")
-      for key, value in self._template_vars.items():
+      for key, value in config.items():
         self._debugging(f"  {key} = {value} {'⚙️' if key in self._system_template_vars_defaults else ''}")
-      # extract system_template_vars since it aren't real (template) vars
-      for key in self._system_template_vars_defaults.keys():
-        self._system_template_vars[key] = self._template_vars.pop(key, None)
-
     except FileNotFoundError:
       # TODO Notify missing config, which is needed
       # temp solution might be to generate a default one and use that?
       pass
-    except KeyError:
-      pass
-
-  def _load_personal_default_values(self):
-    try:
-      with open(os.path.expanduser("~/.pypi-template"), encoding="utf-8") as fp:
-        self._default_values.update(yaml.safe_load(fp))
-    except Exception:
-      pass
+    return config
+
+  def _load_personal_default_values(self, default_values):
+    # organisation-wide and personal default values
+    from pypi_template.config import defaults
+    with self._timed("load-defaults"):
+      default_values.update(defaults())
+
+  def _fresh(self):
+    # a new instance, with the same options, except for force, which only
+    # applies to the first run, reloading all (changed) inputs
+    project = PyPiTemplate(root=self._root, options=Options(
+      verbose = self._be_verbose,
+      debug   = self._show_debug,
+      yes     = self._say_yes_to_all,
+      offline = self._offline,
+      workers = self._workers
+    ))
+    for option in [ "_as_json", "_timings", "_events" ]:
+      setattr(project, option, getattr(self, option))
+    return project
 
   def _collect_templates(self):
+    return { name : self._template(name) for name in self._template_info }
+
+  def _template(self, name):
+    # compiled templates are cached by the environment
+    with self._timed("compile", name):
+      return self._environment.get_template(self._template_info[name]["resource"])
+
+  def _discover_templates(self):
+    builtin = self._discover_builtin_templates()
+    if not self._layers:
+      return builtin
+    from pypi_template.layers import merge
+    return merge(builtin, self._layers, self._environment, self._timed)
+
+  def _discover_builtin_templates(self):
+    if self._manifest:
+      return {
+        template["name"] : template for template in self._manifest["templates"]
+      }
+    from pypi_template.cache import VariablesCache, digest
+    from pypi_template.manifest import analyse, name
+    cache = VariablesCache()
+    templates = {}
     for resource in self._list_resources():
-      name = resource.replace("(dot)", ".")
-      self._templates[name] = self._environment.get_template(resource)
-      # extract template variables
       source = self._load_resource(resource)
-      for var in meta.find_undeclared_variables(self._environment.parse(source)):
-        self._debugging(f"🔎 found variable in {name} : {var}")
-        if var not in self._template_vars and var not in self._system_vars:
-          self._template_vars[var] = None
+      source_digest = digest(source)
+      found = cache.get(resource, source_digest)
+      if found is None:
+        # extract template variables and referenced templates
+        with self._timed("parse", name(resource)) as sample:
+          found = analyse(self._environment, source)
+          sample["bytes"] = len(source)
+        cache.set(resource, source_digest, **found)
+      templates[name(resource)] = {
+        "resource" : resource,
+        "name"     : name(resource),
+        "digest"   : source_digest,
+        **found
+      }
+    cache.save()
+    return templates
 
   def _collect_all_vars(self):
     for var in sorted(self._template_vars.keys()):
@@ -414,116 +813,354 @@ class PyPiTemplate():
         current = self._default_values[var]
       else:
         current = ""
-    self[var] = prompt(
-      [("class:underlined", question)], style=style, default=current
-    )
+    self[var] = self._prompt(question, default=current)
 
   def __collect_var_selections(self, var, current=None):
     if not current:
       current = []
     if len(current) > 0:
+      from colorama import Fore
       logger.info(Fore.BLUE + f"Current {var.replace('_', ' ')}:")
       for selection in current:
         logger.info(Fore.BLUE + f"- {selection}")
-    question = f"Select {var.replace('_', ' ')}: "
-    values   = self._var_lists[var]
-    if values:
-      completer = FuzzyWordCompleter(values)
+    question  = f"Select {var.replace('_', ' ')}: "
+    completer = self._var_lists[var]
+    if completer:
+      completer = completer()
     selections = list(current)
     selection = None
     while selection != "":
-      if values:
-        selection = prompt(
-          [("class:underlined", question)],
-          style=style,
-          completer=completer,
-          complete_while_typing=True
+      if completer:
+        selection = self._prompt(
+          question, completer=completer, complete_while_typing=True
         )
       else:
-        selection = prompt([("class:underlined", question)], style=style)
+        selection = self._prompt(question)
       if selection != "":
         if selection not in selections:
           selections.append(selection)
     self[var] = selections
 
+  def _prompt(self, question, **kwargs):
+    from prompt_toolkit import prompt
+    from prompt_toolkit.styles import Style
+    style = Style.from_dict({ "underlined": "underline" })
+    return prompt([("class:underlined", question)], style=style, **kwargs)
+
   def _changed_files(self):
-    excluded = [ "base/index.md", "base/classifiers.txt" ]
-    reported = []
-
-    def _is_skipped_folder(folder):
-      for path in self._template_vars["skip"]:
-        if folder.startswith(path):
-          if folder not in reported:
-            self._being_verbose(f"⏭  skipping '{folder}' due to skipped '{path}'")
-            reported.append(folder)
-          return True
-      return False
+    from pypi_template.skip import matcher
+    excluded = { "base/index.md", "base/classifiers.txt" }
+    reported = set()
+    skip     = matcher(self._template_vars.get("skip", None))
 
-    for filename, template in self._templates.items():
+    for filename in self._template_info:
       if filename in excluded:
         if filename not in reported:
           self._being_verbose(f"🛑 not rendering excluded {filename}")
-          reported.append(filename)
+          reported.add(filename)
         continue
       directory = os.path.dirname(filename)
-      if "skip" in self._template_vars:
-        if _is_skipped_folder(directory):
-          continue
-        if filename in self._template_vars["skip"]:
-          if filename not in reported:
-            self._being_verbose(f"⏭  skipping {filename}")
-            reported.append(filename)
-          continue
-      yield filename, template
+      entry     = skip.folder(directory)
+      if entry:
+        if directory not in reported:
+          self._being_verbose(f"⏭  skipping '{directory}' due to skipped '{entry}'")
+          reported.add(directory)
+        self._emit("skipped", filename=filename, entry=entry)
+        continue
+      entry = skip.file(filename)
+      if entry:
+        if filename not in reported:
+          self._being_verbose(f"⏭  skipping {filename}")
+          reported.add(filename)
+        self._emit("skipped", filename=filename, entry=entry)
+        continue
+      yield filename
+
+  def _applied_vars(self):
+    applied_vars = self._template_vars.copy()
+    applied_vars.update(self._system_vars)
+    return {
+      key : "" if value is None else value for key, value in applied_vars.items()
+    }
+
+  def _locked_vars(self, applied_vars):
+    # all variables that are used in templates and determine what is rendered
+    return {
+      var : applied_vars.get(var, "")
+      for var in sorted(self._variable_templates) + [ "skip" ]
+    }
+
+  def _affected_templates(self, lock, applied_vars):
+    # the templates that are affected by changed variables since the last
+    # apply, or None if all templates need to be rendered
+    if self._force or lock is None:
+      return None
+    changed = lock.changed_variables(self._locked_vars(applied_vars))
+    if "skip" in changed:
+      return None
+    affected = set()
+    for var in changed:
+      self._debugging(f"👉 {var} changed since last apply")
+      affected.update(self._variable_templates.get(var, set()))
+    return affected
+
+  def _output_filename(self, filename):
+    # TODO generalize?
+    return filename.replace(
+      "(package_module_name)", self._template_vars["package_module_name"]
+    )
 
   def _render_files(self):
+    from concurrent.futures import ThreadPoolExecutor
+    from pypi_template.lock import Lock
     self._being_verbose("🔨 applying templates")
-    for filename, template in self._changed_files():
-      # TODO generalize?
-      filename = filename.replace(
-        "(package_module_name)", self._template_vars["package_module_name"]
-      )
-      directory = os.path.dirname(filename)
-      if directory != "" and not os.path.exists(directory):
-        self._mkdir(directory)
-      applied_vars = self._template_vars.copy()
-      applied_vars.update(self._system_vars)
-      applied_vars = {
-        key : "" if value is None else value for key, value in applied_vars.items()
-      }
-      new_content = template.render(**applied_vars)
-      if os.path.isfile(filename):
-        with open(filename, encoding="utf-8") as file:
-          original_content = file.read()
-        if new_content == original_content:
+    # the context is the same for all templates
+    applied_vars = self._applied_vars()
+    previous     = Lock.load(root=self._root)
+    affected     = self._affected_templates(previous, applied_vars)
+    lock         = Lock(variables=self._locked_vars(applied_vars), root=self._root)
+
+    def render(name):
+      return self._render_file(name, applied_vars, previous, affected)
+
+    # render and compare concurrently, but handle the results, logging and
+    # writing, in order
+    with ThreadPoolExecutor(max_workers=self._workers) as executor:
+      futures = [ executor.submit(render, name) for name in self._changed_files() ]
+      handled = 0
+      try:
+        for future in futures:
+          self._handle_rendered_file(future.result(), previous, lock)
+          handled += 1
+      finally:
+        # on failure, don't leave temporary files of unhandled results behind
+        if handled < len(futures):
+          for future in futures[handled:]:
+            future.cancel()
+          for future in futures[handled:]:
+            if not future.cancelled() and not future.exception():
+              self._remove(future.result()["temp"])
+    if self._going_to("🔒 saving lock"):
+      lock.save()
+
+  def _drifted_files(self):
+    # renders all files concurrently, only hashing them, and returns the
+    # filename and state of those that differ from the files on disk
+    from concurrent.futures import ThreadPoolExecutor
+    from pypi_template.lock import Lock
+    applied_vars = self._applied_vars()
+    previous     = Lock.load(root=self._root)
+    affected     = self._affected_templates(previous, applied_vars)
+
+    def compare(name):
+      return self._render_file(name, applied_vars, previous, affected, write=False)
+
+    with ThreadPoolExecutor(max_workers=self._workers) as executor:
+      return [
+        (result["filename"], result["state"])
+        for result in executor.map(compare, list(self._changed_files()))
+        if result["state"] in [ "new", "changed" ]
+      ]
+
+  def _render_file(self, name, applied_vars, previous, affected, write=True):
+    # renders a template, streaming it into a temporary file while hashing it,
+    # and compares it to the existing file, without touching the latter, so
+    # that it can run concurrently
+    result = {
+      "filename"       : self._output_filename(name),
+      "digest"         : self._template_digests[name],
+      "state"          : "new",
+      "temp"           : None,
+      "content_digest" : None
+    }
+    if affected is not None and name not in affected and \
+       previous.unchanged(result["filename"], result["digest"]):
+      result["state"] = "up to date"
+      return result
+    template = self._template(name)
+    with self._timed("render", name) as sample:
+      if self._show_debug or not write:
+        result["content_digest"], sample["bytes"] = self._stream(template, applied_vars)
+      else:
+        result["temp"] = self._temp_filename(self._path(result["filename"]))
+        try:
+          with open(result["temp"], "xb") as outfile:
+            result["content_digest"], sample["bytes"] = self._stream(
+              template, applied_vars, outfile
+            )
+        except BaseException:
+          self._remove(result["temp"])
+          raise
+    with self._timed("compare", name) as compare:
+      path = self._path(result["filename"])
+      if os.path.isfile(path):
+        # only compute a digest if the size is the same
+        size = os.stat(path).st_size
+        compare["bytes"] = size
+        if size == sample["bytes"] and file_digest(path) == result["content_digest"]:
+          result["state"] = "unchanged"
+        else:
+          result["state"] = "changed"
+    self._emit(
+      "rendered", filename=result["filename"], state=result["state"],
+      bytes=sample["bytes"]
+    )
+    return result
+
+  def _stream(self, template, applied_vars, outfile=None):
+    # renders a template chunk by chunk, optionally writing it to a file, and
+    # returns the digest and size of the rendered content
+    import hashlib
+    content_digest = hashlib.sha256()
+    size           = 0
+    for chunk in template.generate(**applied_vars):
+      data = chunk.encode("utf-8")
+      content_digest.update(data)
+      size += len(data)
+      if outfile:
+        outfile.write(data)
+    return content_digest.hexdigest(), size
+
+  def _temp_filename(self, filename):
+    # a unique, hidden file in the same folder, or in the project's root if
+    # that doesn't exist yet, to atomically replace the file with
+    import uuid
+    directory = os.path.dirname(filename)
+    if not directory or not os.path.isdir(directory):
+      directory = self._path(".")
+    return os.path.join(
+      directory, f".{os.path.basename(filename)}.{uuid.uuid4().hex}.tmp"
+    )
+
+  def _handle_rendered_file(self, result, previous, lock):
+    filename = result["filename"]
+    if result["state"] == "up to date":
+      self._being_verbose(f"⏩ {filename} is up to date")
+      self._emit("unchanged", filename=filename, reason="lock")
+      lock.outputs[filename] = previous.outputs[filename]
+      return
+    if result["state"] == "unchanged":
+      self._being_verbose(f"✅ {filename} has no changes")
+      self._emit("unchanged", filename=filename, reason="content")
+      self._remove(result["temp"])
+      lock.record(filename, result["digest"], result["content_digest"])
+      return
+    directory = os.path.dirname(filename)
+    if directory != "" and not os.path.exists(self._path(directory)):
+      self._mkdir(directory)
+    if result["state"] == "changed":
+      self._being_verbose(f"✍️  {filename} was changed")
+      self._backup(filename)
+    self._write_file(filename, result["temp"])
+    if not self._show_debug:
+      lock.record(filename, result["digest"], result["content_digest"])
+
+  def _diff_files(self):
+    # yields the filename, state and unified diff of each file that would be
+    # changed by apply, rendering them one at a time, and only rendering them
+    # into memory if they are small enough to be diffed
+    import difflib
+    applied_vars = self._applied_vars()
+    for name in self._changed_files():
+      filename = self._output_filename(name)
+      path     = self._path(filename)
+      template = self._template(name)
+      content_digest, rendered = self._stream(template, applied_vars)
+      state    = "new"
+      size     = 0
+      if os.path.isfile(path):
+        # only diff files that differ in size or digest
+        size = os.stat(path).st_size
+        if size == rendered and file_digest(path) == content_digest:
           self._being_verbose(f"✅ {filename} has no changes")
           continue
-        self._being_verbose(f"✍️  {filename} was changed")
-        self._backup(filename)
-      self._write_file(filename, new_content)
+        state = "changed"
+      if max(size, rendered) > MAX_DIFF_SIZE:
+        if state == "new":
+          yield filename, state, [
+            "--- /dev/null\n",
+            f"+++ b/{filename}\n",
+            f"new file ({rendered} bytes)\n"
+          ]
+        else:
+          yield filename, state, [
+            f"--- a/{filename}\n",
+            f"+++ b/{filename}\n",
+            f"files differ ({size} -> {rendered} bytes)\n"
+          ]
+        continue
+      original = []
+      if state == "changed":
+        with open(path, encoding="utf-8") as file:
+          original = file.readlines()
+      content = template.render(**applied_vars)
+      yield filename, state, list(difflib.unified_diff(
+        original, content.splitlines(keepends=True),
+        fromfile="/dev/null" if state == "new" else f"a/{filename}",
+        tofile=f"b/{filename}"
+      ))
 
   # filesystem helpers
 
+  def _path(self, filename):
+    # the path of a file of the project, without depending on the cwd
+    return os.path.join(self._root, filename) if self._root else filename
+
   def _mkdir(self, directory):
     if self._going_to(f"📁 creating directory {directory}"):
-      os.makedirs(directory)
+      os.makedirs(self._path(directory))
 
   def _backup(self, filename):
     if self._going_to(f"   💾 backing up {filename}"):
-      os.rename(filename, filename + ".backup")
+      with self._timed("backup", filename):
+        os.rename(self._path(filename), self._path(filename + ".backup"))
+      self._emit("backed-up", filename=filename, backup=filename + ".backup")
 
-  def _write_file(self, filename, new_content):
+  def _write_file(self, filename, temp):
+    # writing is atomically replacing the file with the rendered temporary one
     if self._going_to(f"   💾 writing {filename}"):
-      with open(filename, "w", encoding="utf-8") as outfile:
-        outfile.write(new_content)
+      with self._timed("write", filename) as sample:
+        sample["bytes"] = os.stat(temp).st_size
+        os.replace(temp, self._path(filename))
+      self._written.append(filename)
+      self._emit("written", filename=filename, bytes=sample["bytes"])
+    else:
+      self._remove(temp)
+
+  def _remove(self, filename):
+    if filename and os.path.exists(filename):
+      os.remove(filename)
 
   # output helpers
 
-  def _out(self, data):
-    if self._as_json:
+  def _out(self, data, as_json=None):
+    if self._as_json if as_json is None else as_json:
       return json.dumps(data, indent=2, default=str)
     return data
 
+  def _result(self, command, data):
+    # the final result of a command, as output or, when streaming, as event
+    if self._events:
+      self._emit("result", command=command, data=data)
+      return None
+    return self._out(data)
+
+  def _emit(self, event, **fields):
+    if self._events:
+      self._events.emit(event, **fields)
+
+  def _timed(self, phase, template=None):
+    if self._events:
+      return self._events.measure(phase, template, self._timings)
+    if self._timings:
+      return self._timings.measure(phase, template)
+    return contextlib.nullcontext({ "bytes" : 0 })
+
+  def _report_timings(self):
+    # called at the end of a run, reports timings if they were recorded
+    if self._timings:
+      print(self._out(self._timings.report(), as_json=True), file=sys.stderr)
+
   def _being_verbose(self, msg):
     if self._be_verbose or self._show_debug:
       logger.info(msg)
@@ -549,35 +1186,17 @@ class PyPiTemplate():
 
   # resources helpers
 
-  def _load_classifiers(self):
-    return str(
-      self._load_resource("base", "classifiers.txt"), "utf-8"
-    ).split("\n")
+  def _classifier_completer(self):
+    from pypi_template.classifiers import completer
+    return completer(self._classifier_index)
 
   def _load_resource(self, *args):
-    f = importlib_resources.files(__name__).joinpath("templates", *args)
-    return f.read_bytes()
-
-  def _list_resources(self, package="pypi_template.templates"):
-    excluded_ext = ".pyc"
-    excluded     = [
-      "__pycache__",
-      "pypi_template.templates.__init__.py",
-      "pypi_template.templates.(dot)github.__init__.py",
-      "pypi_template.templates.base.__init__.py",
-      "pypi_template.templates.docs._static.__init__.py"
-    ]
-    files = []
-
-    for entry in importlib_resources.files(package).iterdir():
-      resource = entry.name
-      if resource.endswith(excluded_ext) or \
-         resource in excluded or \
-         f"{package}.{resource}" in excluded:
-        pass
-      elif importlib_resources.files(package).joinpath(resource).is_dir():
-        subfiles = self._list_resources(f"{package}.{resource}")
-        files += [ os.path.join(resource, f) for f in subfiles ]
-      else:
-        files.append(resource)
-    return files
+    from pypi_template.manifest import read
+    return read(os.path.join(*args))
+
+  def _list_resources(self):
+    if self._manifest:
+      return [ template["resource"] for template in self._manifest["templates"] ]
+    from pypi_template.manifest import walk
+    with self._timed("list-resources"):
+      return walk()
@@ -1,12 +1,67 @@
-from fire import Fire
+import os
+import sys
+import logging
 
 from pypi_template import PyPiTemplate
+from pypi_template.daemon import forward, replay
+
+def setup_logging():
+  # console output is only configured when used as a command line tool, and
+  # only once a command actually logs something, rich is imported
+  class LazyRichHandler(logging.Handler):
+    def __init__(self):
+      super().__init__()
+      self._handler = None
+
+    def emit(self, record):
+      if self._handler is None:
+        from rich.console import Console
+        from rich.logging import RichHandler
+        # not recording, which would keep all output for the life of the process
+        console = Console(stderr=True)
+        self._handler = RichHandler(console=console, markup=True)
+        self._handler.setFormatter(self.formatter)
+      self._handler.handle(record)
+
+  FORMAT="%(message)s"
+  DATEFMT="[%X]"
+  handler = LazyRichHandler()
+  handler.setFormatter(logging.Formatter(FORMAT, datefmt=DATEFMT))
+  handlers = [ handler ]
+  # an optional structured log sink, see pypi_template.logs
+  from pypi_template.logs import sink
+  try:
+    custom = sink()
+  except (ImportError, AttributeError, ValueError) as e:
+    custom = None
+    print(f"🚨 can't load log sink: {e}", file=sys.stderr)
+  if custom:
+    handlers.append(custom)
+  logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    format=FORMAT, datefmt=DATEFMT,
+    handlers=handlers
+  )
+
+  from colorama import init
+  init(autoreset=True)
 
 def cli():
+  # hand the command over to a running daemon, if possible
+  response = forward(sys.argv[1:])
+  if response is not None:
+    setup_logging()
+    sys.exit(replay(response))
+  setup_logging()
+  from fire import Fire
+  template = PyPiTemplate()
   try:
-    Fire(PyPiTemplate(), name="pypi-template")
+    Fire(template, name="pypi-template")
   except KeyboardInterrupt:
     pass
+  finally:
+    template._report_timings()
+  sys.exit(template._exit_code)
 
 if __name__ == "__main__":
   cli()
@@ -0,0 +1,84 @@
+"""
+Programmatic API, to render projects in-process.
+
+  Examples of usage:
+
+      from pypi_template.api import Options, render, apply, check
+
+      files   = render("~/Workspace/project")   # { filename : content }
+      written = apply("~/Workspace/project", Options(force=True))
+      drifted = check("~/Workspace/project")
+
+Projects are identified by their root folder and options are passed explicitly,
+instead of being looked up on the command line. Nothing depends on, or changes,
+the current working directory, so many projects can be handled concurrently,
+from many threads. The template state that only depends on the templates (the
+Jinja environment, with its compiled templates, and the index of templates) is
+built once and shared by all projects using the same template layers, until
+any of the templates changes.
+"""
+
+import os
+import threading
+
+from pypi_template         import PyPiTemplate
+from pypi_template.options import Options
+from pypi_template.daemon  import WARM, fingerprint
+
+__all__ = [ "Options", "project", "render", "apply", "check" ]
+
+# shared template state, per set of template layers
+_shared = {}
+_lock   = threading.Lock()
+
+def project(root, options=None):
+  """
+  Returns a PyPiTemplate for a project root, using the shared template state.
+  """
+  project = PyPiTemplate(
+    root=os.path.abspath(os.path.expanduser(str(root))),
+    options=options or Options()
+  )
+  key     = tuple(str(layer.root) for layer in project._layers)
+  current = fingerprint(project._layers)
+  with _lock:
+    state = _shared.get(key, None)
+    if state is None or state["fingerprint"] != current:
+      # compile all templates once, they are cached by the environment
+      project._preload(*WARM, "_templates")
+      state = {
+        "fingerprint" : current,
+        "attributes"  : { attribute : project.__dict__[attribute] for attribute in WARM }
+      }
+      _shared[key] = state
+  for attribute, value in state["attributes"].items():
+    setattr(project, attribute, value)
+  return project
+
+def render(root, options=None):
+  """
+  Renders a project in memory, without writing anything, and returns a mapping
+  of the filenames of all generated files to their content.
+  """
+  current   = project(root, options)
+  variables = current._applied_vars()
+  return {
+    current._output_filename(name) : current._template(name).render(**variables)
+    for name in current._changed_files()
+  }
+
+def apply(root, options=None):
+  """
+  Applies the templates to a project on disk and returns the written files.
+  """
+  current = project(root, options)
+  current.apply()
+  return current._written
+
+def check(root, options=None):
+  """
+  Returns the generated files of a project that are missing or out of date.
+  """
+  current = project(root, options)
+  current.check()
+  return current._drifted
@@ -0,0 +1,149 @@
+"""
+Persistent, on-disk cache for compiled templates and discovered variables.
+
+The cache lives in a folder per installed version of pypi-template, by default
+`~/.cache/pypi-template/<version>` (honouring `XDG_CACHE_HOME`). It can be
+relocated by setting `PYPI_TEMPLATE_CACHE` to another folder, or disabled by
+setting it to `off`.
+
+Compiled templates are stored using Jinja's bytecode cache, which is keyed on
+the template name and a checksum of its source. Discovered variables are stored
+in a single JSON file, keyed on the template name and a digest of its content.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from pypi_template import __version__
+
+import logging
+logger = logging.getLogger(__name__)
+
+DISABLED = [ "off", "no", "false", "0" ]
+
+def cache_dir():
+  """
+  Returns the cache folder for the current version, or None if disabled.
+  """
+  root = os.environ.get("PYPI_TEMPLATE_CACHE", None)
+  if root is not None and root.lower() in DISABLED:
+    return None
+  if not root:
+    root = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")) / "pypi-template"
+  return Path(root).expanduser() / __version__
+
+def digest(content):
+  """
+  Returns a hex digest of the given (bytes or str) content.
+  """
+  if isinstance(content, str):
+    content = content.encode("utf-8")
+  return hashlib.sha256(content).hexdigest()
+
+def bytecode_cache():
+  """
+  Returns a Jinja bytecode cache in the cache folder, or None if disabled or
+  the folder can't be created.
+  """
+  folder = cache_dir()
+  if folder is None:
+    return None
+  folder = folder / "bytecode"
+  try:
+    folder.mkdir(parents=True, exist_ok=True)
+  except OSError as e:
+    logger.debug(f"🚨 can't create bytecode cache {folder}: {e}")
+    return None
+  from jinja2 import FileSystemBytecodeCache
+  return FileSystemBytecodeCache(str(folder))
+
+class JSONCache():
+  """
+  A dictionary of entries, persisted as a JSON file in the cache folder.
+  """
+  def __init__(self, name):
+    folder = cache_dir()
+    self._path    = folder / name if folder else None
+    self._entries = {}
+    self._dirty   = False
+    if self._path:
+      try:
+        self._entries = json.loads(self._path.read_text(encoding="utf-8"))
+      except (OSError, ValueError):
+        pass
+
+  def save(self):
+    """
+    Persists the cache, if anything changed, replacing it atomically.
+    """
+    if not self._path or not self._dirty:
+      return
+    try:
+      self._path.parent.mkdir(parents=True, exist_ok=True)
+      tmp = self._path.with_suffix(f".{os.getpid()}.tmp")
+      tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+      os.replace(tmp, self._path)
+      self._dirty = False
+    except OSError as e:
+      logger.debug(f"🚨 can't save cache {self._path}: {e}")
+
+class VariablesCache(JSONCache):
+  """
+  Keeps the variables and referenced templates that were discovered in a
+  template, keyed on the name of the template and a digest of its content.
+  """
+  def __init__(self, name="variables.json"):
+    super().__init__(name)
+
+  def get(self, name, content_digest):
+    """
+    Returns the cached variables and references for a template, or None if
+    unknown or stale.
+    """
+    entry = self._entries.get(name, None)
+    if entry and entry["digest"] == content_digest:
+      return {
+        "variables"  : entry["variables"],
+        "references" : entry.get("references", [])
+      }
+    return None
+
+  def set(self, name, content_digest, variables, references=()):
+    """
+    Records the variables and references that were discovered in a template.
+    """
+    self._entries[name] = {
+      "digest"     : content_digest,
+      "variables"  : sorted(variables),
+      "references" : sorted(references)
+    }
+    self._dirty = True
+
+class LayersCache(JSONCache):
+  """
+  Keeps the index of all templates in a template layer, keyed on the layer and
+  a fingerprint of its content.
+  """
+  def __init__(self, name="layers.json"):
+    super().__init__(name)
+
+  def get(self, layer, fingerprint):
+    """
+    Returns the cached index of a layer, or None if unknown or stale.
+    """
+    entry = self._entries.get(layer, None)
+    if entry and entry["fingerprint"] == fingerprint:
+      return entry["templates"]
+    return None
+
+  def set(self, layer, fingerprint, templates):
+    """
+    Records the index of a layer.
+    """
+    self._entries[layer] = {
+      "fingerprint" : fingerprint,
+      "templates"   : templates
+    }
+    self._dirty = True
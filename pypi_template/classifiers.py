@@ -0,0 +1,147 @@
+"""
+Indexed search over the trove classifiers.
+
+The index, `classifiers.json`, is precomputed from `base/classifiers.txt` at
+build time (together with the template manifest) and is only loaded when the
+classifiers are actually needed. It maps every lowercased word of every `::`
+segment to the classifiers it appears in. Searching for a few words then boils
+down to a binary search for the words that start with each typed word and an
+intersection of their classifiers, instead of scanning the full list.
+
+Each classifier is also indexed by its level in the hierarchy, i.e. the number
+of `::` separated segments, which allows filtering on it.
+"""
+
+import re
+import json
+import bisect
+
+import importlib_resources
+
+from pypi_template import __version__
+
+INDEX     = "classifiers.json"
+SEPARATOR = " :: "
+
+def segments(classifier):
+  """
+  Splits a classifier in its hierarchy of segments.
+  """
+  return [ segment.strip() for segment in classifier.split("::") ]
+
+def words(text):
+  """
+  Returns the lowercased words in a text.
+  """
+  return re.findall(r"[\w+#.-]+", text.lower())
+
+def build(classifiers):
+  """
+  Builds the index for a list of classifiers.
+  """
+  classifiers = [ classifier for classifier in classifiers if classifier.strip() ]
+  tokens = {}
+  for index, classifier in enumerate(classifiers):
+    for word in words(classifier):
+      ids = tokens.setdefault(word, [])
+      if not ids or ids[-1] != index:
+        ids.append(index)
+  return {
+    "version"     : __version__,
+    "classifiers" : classifiers,
+    "tokens"      : dict(sorted(tokens.items()))
+  }
+
+def source():
+  """
+  Returns the list of classifiers from the templates.
+  """
+  f = importlib_resources.files("pypi_template").joinpath(
+    "templates", "base", "classifiers.txt"
+  )
+  return f.read_text(encoding="utf-8").split("\n")
+
+def write():
+  """
+  Builds and writes the index into the package.
+  """
+  path = importlib_resources.files("pypi_template").joinpath(INDEX)
+  index = build(source())
+  with open(path, "w", encoding="utf-8") as fp:
+    json.dump(index, fp, separators=(",", ":"))
+    fp.write("\n")
+  return index
+
+class ClassifierIndex():
+  """
+  Searchable index of classifiers.
+  """
+  def __init__(self, index):
+    self.classifiers = index["classifiers"]
+    self._tokens     = index["tokens"]
+    self._vocabulary = sorted(self._tokens)
+    self._levels     = [ len(segments(classifier)) for classifier in self.classifiers ]
+
+  @classmethod
+  def load(cls):
+    """
+    Loads the shipped index, or builds one if it is missing or was built for
+    another version.
+    """
+    try:
+      index = json.loads(
+        importlib_resources.files("pypi_template").joinpath(INDEX).read_text(
+          encoding="utf-8"
+        )
+      )
+      if index["version"] == __version__:
+        return cls(index)
+    except (OSError, ValueError, KeyError):
+      pass
+    return cls(build(source()))
+
+  def _matching(self, word):
+    # all classifiers containing a word starting with the given word
+    start = bisect.bisect_left(self._vocabulary, word)
+    found = set()
+    for token in self._vocabulary[start:]:
+      if not token.startswith(word):
+        break
+      found.update(self._tokens[token])
+    return found
+
+  def search(self, text="", level=None):
+    """
+    Returns the classifiers containing words that start with each of the words
+    in the text, optionally only those at a given level in the hierarchy.
+    """
+    found = None
+    for word in words(text):
+      matching = self._matching(word)
+      found = matching if found is None else found & matching
+      if not found:
+        return []
+    if found is None:
+      found = range(len(self.classifiers))
+    return [
+      self.classifiers[index] for index in sorted(found)
+      if level is None or self._levels[index] == level
+    ]
+
+def completer(index):
+  """
+  Returns a prompt_toolkit completer using the index.
+  """
+  from prompt_toolkit.completion import Completer, Completion
+
+  class ClassifierCompleter(Completer):
+    def get_completions(self, document, complete_event):
+      text = document.text_before_cursor
+      for classifier in index.search(text):
+        yield Completion(classifier, start_position=-len(text))
+
+  return ClassifierCompleter()
+
+if __name__ == "__main__":
+  index = write()
+  print(f"💾 wrote index of {len(index['classifiers'])} classifiers")
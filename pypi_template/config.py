@@ -0,0 +1,129 @@
+"""
+Configuration store for `.pypi-template` files.
+
+Configuration files are parsed and dumped using the libyaml based C loader and
+dumper, if PyYAML was built with it, falling back to the pure Python ones. Each
+parsed file is kept as a snapshot, keyed on its path, modification time and
+size, so a file that didn't change is never parsed twice in the same process.
+Only the most recently used `MAX_SNAPSHOTS` snapshots are kept.
+
+Default values are layered: organisation-wide defaults files, listed in the
+`PYPI_TEMPLATE_DEFAULTS` environment variable (separated by `:`, later files
+overriding earlier ones), are overridden by your personal `~/.pypi-template`.
+They are merged once per process, until any of the files changes.
+"""
+
+import os
+import copy
+import threading
+from collections import OrderedDict
+
+import logging
+logger = logging.getLogger(__name__)
+
+PERSONAL      = "~/.pypi-template"
+MAX_SNAPSHOTS = 256
+
+# parsed files, least recently used first, and merged defaults, keyed on the
+# state of their file(s)
+_snapshots = OrderedDict()
+_lock      = threading.Lock()
+_defaults  = {}
+
+def _yaml():
+  import yaml
+  loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+  dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+  return yaml, loader, dumper
+
+def _key(path):
+  stat = os.stat(path)
+  return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def _snapshot(key):
+  with _lock:
+    snapshot = _snapshots.get(key[0], None)
+    if snapshot is None:
+      return None
+    _snapshots.move_to_end(key[0])
+    return snapshot[1] if snapshot[0] == key else None
+
+def _remember(key, config):
+  with _lock:
+    _snapshots[key[0]] = (key, config)
+    _snapshots.move_to_end(key[0])
+    while len(_snapshots) > MAX_SNAPSHOTS:
+      _snapshots.popitem(last=False)
+
+def _parse(path):
+  key      = _key(path)
+  snapshot = _snapshot(key)
+  if snapshot is not None:
+    return snapshot, 0
+  yaml, loader, _ = _yaml()
+  with open(path, encoding="utf-8") as fp:
+    content = fp.read()
+  config = yaml.load(content, Loader=loader) or {}
+  if not isinstance(config, dict):
+    raise ValueError(f"{path} doesn't contain a mapping of variables")
+  _remember(key, config)
+  return config, len(content)
+
+def load(path, sample=None):
+  """
+  Returns the variables in a configuration file. Raises FileNotFoundError if it
+  doesn't exist. An optional sample dict receives the number of parsed bytes.
+  """
+  config, size = _parse(path)
+  if sample is not None:
+    sample["bytes"] = size
+  return copy.deepcopy(config)
+
+def save(config, path):
+  """
+  Writes variables to a configuration file, replacing it atomically.
+  """
+  yaml, _, dumper = _yaml()
+  content = yaml.dump(config, Dumper=dumper, default_flow_style=False)
+  temp = f"{path}.tmp"
+  with open(temp, "w", encoding="utf-8") as fp:
+    fp.write(content)
+  os.replace(temp, path)
+  _remember(_key(path), copy.deepcopy(config))
+
+def defaults_files():
+  """
+  Returns the organisation-wide and personal defaults files, in order.
+  """
+  files = [
+    path for path in os.environ.get("PYPI_TEMPLATE_DEFAULTS", "").split(os.pathsep)
+    if path
+  ]
+  return files + [ os.path.expanduser(PERSONAL) ]
+
+def defaults():
+  """
+  Returns the merged default values of all existing defaults files. Files that
+  can't be read or parsed are skipped with a warning.
+  """
+  found = []
+  for path in defaults_files():
+    try:
+      found.append((path, _key(path)))
+    except FileNotFoundError:
+      pass
+    except OSError as e:
+      logger.warning(f"🚨 can't read defaults from {path}: {e}")
+  state  = tuple(key for _, key in found)
+  merged = _defaults.get(state, None)
+  if merged is None:
+    yaml   = _yaml()[0]
+    merged = {}
+    for path, _ in found:
+      try:
+        merged.update(_parse(path)[0])
+      except (OSError, ValueError, yaml.YAMLError) as e:
+        logger.warning(f"🚨 ignoring defaults in {path}: {e}")
+    _defaults.clear()
+    _defaults[state] = merged
+  return copy.deepcopy(merged)
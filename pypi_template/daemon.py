@@ -0,0 +1,244 @@
+"""
+Long-running daemon, keeping the template environment warm.
+
+  Examples of usage:
+
+      % pypi-template serve &                          # start the daemon
+      % pypi-template status                           # handled by the daemon
+      % PYPI_TEMPLATE_SOCKET=off pypi-template status  # handled locally
+
+The daemon listens on a Unix socket, by default `serve.sock` in the cache
+folder, or the path in `PYPI_TEMPLATE_SOCKET`. While it is running, the
+`status`, `variables`, `apply`, `diff`, `check` and `classifiers` commands
+(optionally combined with the `verbose`, `force`, `debug`, `yes`, `json`,
+`events` and `offline` options) are forwarded to it, from the project folder they were issued in.
+Other commands, e.g. interactive ones like `edit`, are always handled locally.
+
+The daemon keeps the Jinja environment, with its compiled templates, the index
+of templates and the classifier index in memory, per set of template layers.
+They are invalidated when any of the templates changes. Configuration files
+are reloaded when they change. Note that the daemon uses its own environment
+variables, e.g. `PYPI_TEMPLATE_LAYERS`, not those of the forwarded command.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import socketserver
+from pathlib import Path
+from contextlib import redirect_stdout, redirect_stderr
+
+from pypi_template.cache import DISABLED, cache_dir, digest
+from pypi_template.logs  import Recorder
+
+import logging
+logger = logging.getLogger(__name__)
+
+# the maximum number of log messages sent to the client, per request
+MAX_RECORDS = 10000
+
+FORWARDED = [ "status", "variables", "apply", "diff", "check", "classifiers" ]
+OPTIONS   = [ "verbose", "force", "debug", "yes", "json", "events", "offline" ]
+
+# template state that only depends on the templates and is kept across requests
+WARM = [
+  "_manifest",
+  "_environment",
+  "_template_info",
+  "_template_variables",
+  "_template_dependencies",
+  "_template_digests",
+  "_variable_templates"
+]
+
+def socket_path():
+  """
+  Returns the path of the daemon's socket, or None if disabled.
+  """
+  path = os.environ.get("PYPI_TEMPLATE_SOCKET", None)
+  if path is not None:
+    return None if not path or path.lower() in DISABLED else Path(path).expanduser()
+  folder = cache_dir()
+  return folder / "serve.sock" if folder else None
+
+def forwardable(args):
+  """
+  Returns whether a command line can be handled by the daemon.
+  """
+  # classifiers takes arguments, and therefore must be the last command
+  if "classifiers" in args:
+    args = args[:args.index("classifiers") + 1]
+  return any(arg in FORWARDED for arg in args) and \
+         all(arg in FORWARDED + OPTIONS for arg in args)
+
+def _connect(path):
+  client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    client.connect(str(path))
+  except OSError:
+    client.close()
+    raise
+  return client
+
+def forward(args, path=None):
+  """
+  Forwards a command line to a running daemon and returns its response, or
+  None if it can't be forwarded or no daemon is running.
+  """
+  args = list(args)
+  if not forwardable(args):
+    return None
+  path = path or socket_path()
+  if path is None or not os.path.exists(path):
+    return None
+  request = { "cwd" : os.getcwd(), "args" : args }
+  try:
+    with _connect(path) as client:
+      client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+      with client.makefile("rb") as fp:
+        return json.loads(fp.read())
+  except (OSError, ValueError) as e:
+    logger.debug(f"🔌 can't reach daemon on {path}: {e}")
+    return None
+
+def replay(response):
+  """
+  Outputs a response from the daemon and returns its exit code.
+  """
+  for record in response["log"]:
+    log = logging.getLogger(record["name"])
+    if log.isEnabledFor(record["levelno"]):
+      log.handle(logging.makeLogRecord(record))
+  if response.get("dropped", 0):
+    logger.warning(f"🚨 {response['dropped']} earlier log messages were dropped")
+  sys.stderr.write(response["stderr"])
+  sys.stdout.write(response["stdout"])
+  sys.stdout.flush()
+  return response["code"]
+
+def fingerprint(layers):
+  """
+  Returns a fingerprint of the built-in templates and the given layers.
+  """
+  from pypi_template.layers import Layer
+  return digest("".join(
+    layer.fingerprint(layer.resources())
+    for layer in [ Layer("package:pypi_template"), *layers ]
+  ))
+
+class Handler(socketserver.StreamRequestHandler):
+  def handle(self):
+    line = self.rfile.readline()
+    if not line:
+      return  # e.g. a probe for a running daemon
+    try:
+      request  = json.loads(line)
+      response = self.server.execute(request["cwd"], request["args"])
+    except (ValueError, KeyError, TypeError) as e:
+      response = { "stdout" : "", "stderr" : f"invalid request: {e}\n", "log" : [], "code" : 2 }
+    try:
+      self.wfile.write(json.dumps(response).encode("utf-8"))
+    except OSError as e:
+      logger.warning(f"🔌 client went away: {e}")
+
+class Daemon(socketserver.UnixStreamServer):
+  """
+  Handles forwarded commands, one at a time, using warm template state.
+  """
+  def __init__(self, path):
+    self.path        = Path(path)
+    self._warm       = {}
+    self._classifier = None
+    self._prepare()
+    super().__init__(str(self.path), Handler)
+
+  def _prepare(self):
+    # refuse to take over from a running daemon, but clean up a stale socket
+    if self.path.exists():
+      try:
+        _connect(self.path).close()
+      except OSError:
+        self.path.unlink()
+      else:
+        raise RuntimeError(f"a daemon is already listening on {self.path}")
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+
+  def server_bind(self):
+    # the socket is only accessible by its owner from the moment it is created
+    previous = os.umask(0o177)
+    try:
+      super().server_bind()
+    finally:
+      os.umask(previous)
+
+  def server_close(self):
+    super().server_close()
+    if self.path.exists():
+      self.path.unlink()
+
+  def execute(self, cwd, args):
+    """
+    Executes a command line in a project folder and returns its output.
+    """
+    from fire import Fire
+    from pypi_template import PyPiTemplate
+    from pypi_template.options import Options
+    if not forwardable(args):
+      raise ValueError(f"can't handle {' '.join(args)}")
+    stdout, stderr = io.StringIO(), io.StringIO()
+    # log messages are sent to the client, instead of the daemon's console
+    recorder = Recorder(capacity=MAX_RECORDS)
+    root     = logging.getLogger()
+    handlers = root.handlers
+    root.handlers = [ recorder ]
+    code = 0
+    try:
+      # the forwarded command line provides the options, the cwd the root
+      project = PyPiTemplate(root=cwd, options=Options.from_argv(args))
+      state   = self._warm_up(project)
+      with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+          Fire(project, command=list(args), name="pypi-template")
+          code = project._exit_code
+        except SystemExit as e:
+          code = e.code if isinstance(e.code, int) else 1
+      self._keep(project, state)
+    except Exception as e:
+      logger.error(f"🛑 {' '.join(args)} failed in {cwd}: {e}")
+      code = 1
+    finally:
+      root.handlers = handlers
+    logger.debug(f"👉 handled {' '.join(args)} in {cwd}")
+    return {
+      "stdout"  : stdout.getvalue(),
+      "stderr"  : stderr.getvalue(),
+      "log"     : recorder.records,
+      "dropped" : recorder.dropped,
+      "code"    : code
+    }
+
+  def _warm_up(self, project):
+    # reuse the template state for the project's layers, if still up to date
+    layers  = project._layers
+    key     = tuple(str(layer.root) for layer in layers)
+    state   = self._warm.get(key, None)
+    current = fingerprint(layers)
+    if state is None or state["fingerprint"] != current:
+      if state is not None:
+        logger.info("♻️  templates changed, reloading")
+      state = { "fingerprint" : current, "attributes" : {} }
+      self._warm[key] = state
+    for attribute, value in state["attributes"].items():
+      setattr(project, attribute, value)
+    if self._classifier is not None:
+      project._classifier_index = self._classifier
+    return state
+
+  def _keep(self, project, state):
+    for attribute in WARM:
+      if attribute in project.__dict__:
+        state["attributes"][attribute] = project.__dict__[attribute]
+    if "_classifier_index" in project.__dict__:
+      self._classifier = project._classifier_index
@@ -0,0 +1,435 @@
+"""
+Environments of a project: provisioning them and keeping them in sync.
+
+A project has a `run` environment, with its `requires`, a `docs` environment,
+with the requirements in `requirements.docs.txt`, and a `test` environment per
+Python version, with the test tooling and its `test_requires`. They are named
+`<project>-run`, `<project>-docs` and `<project>-test-<version>`. The Python
+versions are taken from `PYTHON_VERSIONS` and `PYTHON_BASE`, in the
+environment, `.env` or the `Makefile`.
+
+Environments are created by a backend, which is selected with the `backend`
+option or `PYPI_TEMPLATE_BACKEND`:
+* `pyenv` (default) creates pyenv virtualenvs, as the Makefile does
+* `venv` creates virtual environments in `PYPI_TEMPLATE_VENVS`, by default
+  `~/.virtualenvs`, using the interpreter of the requested version
+* `uv` creates them in the same folder, using uv, and installs using uv
+* `<module>:<class>` uses a custom backend class, see `Backend`
+
+Provisioning creates all environments concurrently, while building wheels for
+all requirements once, into a shared cache, from which all environments then
+install.
+
+Syncing an environment compares its requirements with the distributions that
+are installed in it, as reported by `importlib.metadata`, run by the
+environment's own interpreter. Only requirements that are missing or whose
+installed version doesn't match are installed, and only requirements that were
+removed since the previous sync, or from the previous `requires` and
+`test_requires` (e.g. of environments that were created by `make install` and
+were never synced before), are uninstalled. All environments are synced
+concurrently.
+
+Packages are installed using pip, with its own configuration, e.g. use
+`PIP_NO_INDEX=1` and `PIP_FIND_LINKS=<folder>` to only install from a local
+folder of wheels.
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import logging
+logger = logging.getLogger(__name__)
+
+STATE      = "pypi-template.json"
+TEST_TOOLS = [ "ruff", "tox", "coverage" ]
+
+# reports the installed distributions and the interpreter's version
+INSPECT = """
+import sys, json, platform, importlib.metadata as metadata
+print(json.dumps({
+  "installed" : {
+    dist.metadata["Name"] : dist.version for dist in metadata.distributions()
+    if dist.metadata["Name"]
+  },
+  "markers" : {
+    "python_version"      : "%d.%d" % sys.version_info[:2],
+    "python_full_version" : platform.python_version()
+  }
+}))
+"""
+
+def pyenv_root():
+  """
+  Returns the root folder of pyenv.
+  """
+  return Path(os.environ.get("PYENV_ROOT", "~/.pyenv")).expanduser()
+
+def setting(name, default=None, root=None):
+  """
+  Returns a (Makefile) setting from the environment, `.env` or the `Makefile`
+  of the project in `root`, or the cwd.
+  """
+  if name in os.environ:
+    return os.environ[name]
+  pattern = re.compile(rf"^{name}\s*[?:]?=\s*(.*)$")
+  for filename in [ ".env", "Makefile" ]:
+    try:
+      with open(os.path.join(root or ".", filename), encoding="utf-8") as fp:
+        for line in fp:
+          match = pattern.match(line.strip())
+          if match:
+            return match.group(1).strip()
+    except OSError:
+      pass
+  return default
+
+def requirements_file(filename, root=None):
+  """
+  Returns the requirements in a requirements file, relative to `root`, or the
+  cwd.
+  """
+  try:
+    with open(os.path.join(root or ".", filename), encoding="utf-8") as fp:
+      lines = [ line.split("#")[0].strip() for line in fp ]
+  except OSError:
+    return []
+  return [ line for line in lines if line and not line.startswith("-") ]
+
+def backend(spec=None, project=None, root=None):
+  """
+  Returns a backend, given its name or `<module>:<class>`, for a project, by
+  default named after its root folder, or the cwd.
+  """
+  spec = spec or os.environ.get("PYPI_TEMPLATE_BACKEND", "pyenv")
+  if spec in BACKENDS:
+    cls = BACKENDS[spec]
+  elif ":" in spec:
+    import importlib
+    module, _, name = spec.partition(":")
+    cls = getattr(importlib.import_module(module), name)
+  else:
+    raise ValueError(f"unknown backend {spec}, use one of {', '.join(BACKENDS)}")
+  return cls(project or os.path.basename(os.path.abspath(root or os.getcwd())))
+
+def environments(backend, requires, test_requires, docs_requires=(),
+                 versions=None, base=None, previous=None, root=None):
+  """
+  Returns the run, docs and test environments of a project, optionally given
+  the `previous` values of `requires` and `test_requires`.
+  """
+  previous = previous or {}
+  if versions is None:
+    versions = (setting("PYTHON_VERSIONS", root=root) or "").split()
+  base = base or setting("PYTHON_BASE", root=root) or \
+         (versions[-1] if versions else "%d.%d" % sys.version_info[:2])
+  return [
+    Environment("run",  requires,      backend, base,
+                previous=previous.get("requires")),
+    Environment("docs", docs_requires, backend, base),
+    *[
+      Environment(f"test-{version}", TEST_TOOLS + list(test_requires), backend, version,
+                  previous=previous.get("test_requires"))
+      for version in versions
+    ]
+  ]
+
+def discover(backend, requires, test_requires, docs_requires=(), previous=None,
+             root=None):
+  """
+  Returns the existing environments of a project.
+  """
+  found = [
+    environment for environment in environments(
+      backend, requires, test_requires, docs_requires, versions=[],
+      previous=previous, root=root
+    )
+    if environment.exists()
+  ]
+  for path in sorted(backend.folder.glob(f"{backend.project}-test-*")):
+    name = path.name[len(backend.project) + 1:]
+    found.append(Environment(
+      name, TEST_TOOLS + list(test_requires), backend,
+      previous=(previous or {}).get("test_requires")
+    ))
+  return found
+
+def sync(environments, workers=None):
+  """
+  Syncs environments concurrently and returns the result of each.
+  """
+  from concurrent.futures import ThreadPoolExecutor
+  with ThreadPoolExecutor(max_workers=workers or len(environments) or 1) as executor:
+    return list(executor.map(lambda environment: environment.sync(), environments))
+
+def provision(environments, wheels=None, workers=None):
+  """
+  Creates environments concurrently and installs their requirements, using a
+  shared folder of wheels, built once, concurrently, for all requirements.
+  """
+  from concurrent.futures import ThreadPoolExecutor
+  workers = workers or len(environments) + 1
+  with ThreadPoolExecutor(max_workers=workers) as executor:
+    built = None
+    if wheels:
+      requirements = sorted({
+        dep for environment in environments for dep in environment.requirements
+      })
+      built = executor.submit(build_wheels, requirements, wheels)
+
+    def create_and_sync(environment):
+      result = environment.create()
+      if built:
+        built.result()
+      if not result["ok"]:
+        return result
+      synced = environment.sync(find_links=wheels if built else None)
+      synced["created"] = result["created"]
+      return synced
+
+    return list(executor.map(create_and_sync, environments))
+
+def build_wheels(requirements, folder):
+  """
+  Builds, or downloads, wheels for requirements into a folder, reusing the
+  wheels that are already there.
+  """
+  if not requirements:
+    return
+  Path(folder).mkdir(parents=True, exist_ok=True)
+  try:
+    subprocess.run(
+      [ sys.executable, "-m", "pip", "wheel", "--quiet",
+        "--disable-pip-version-check", "--wheel-dir", str(folder),
+        "--find-links", str(folder), *requirements ],
+      capture_output=True, text=True, check=True
+    )
+  except subprocess.CalledProcessError as e:
+    # installing will fall back to the index for missing wheels
+    logger.warning(f"🚨 not all wheels could be built: {e.stderr.strip()}")
+
+class Backend():
+  """
+  Creates environments in a folder and installs packages in them. Subclass it,
+  implementing at least `folder` and `create`, to add a backend.
+  """
+  def __init__(self, project):
+    self.project = project
+
+  @property
+  def folder(self):
+    raise NotImplementedError
+
+  def path(self, name):
+    return self.folder / f"{self.project}-{name}"
+
+  def create(self, environment):
+    raise NotImplementedError
+
+  def interpreter(self, version):
+    # an interpreter of a Python version, from pyenv or the path
+    candidates = [ pyenv_root() / "versions" / version / "bin" / "python" ]
+    major_minor = ".".join(version.split(".")[:2])
+    found = shutil.which(f"python{major_minor}")
+    if found:
+      candidates.append(Path(found))
+    for candidate in candidates:
+      if candidate.is_file():
+        return str(candidate)
+    if sys.version.startswith(version):
+      return sys.executable
+    raise LookupError(f"no interpreter for Python {version}")
+
+  def pip(self, environment, inspected, *args):
+    # the environment's own pip, or ours if it doesn't have one
+    if "pip" in inspected["installed"]:
+      command = [ str(environment.python), "-m", "pip" ]
+    else:
+      command = [ sys.executable, "-m", "pip", "--python", str(environment.python) ]
+    return [ *command, *args, "--quiet", "--disable-pip-version-check" ]
+
+class Pyenv(Backend):
+  @property
+  def folder(self):
+    return pyenv_root() / "versions"
+
+  def create(self, environment):
+    subprocess.run(
+      [ "pyenv", "virtualenv", environment.version, environment.path.name ],
+      capture_output=True, text=True, check=True
+    )
+
+class Venv(Backend):
+  @property
+  def folder(self):
+    return Path(os.environ.get("PYPI_TEMPLATE_VENVS", "~/.virtualenvs")).expanduser()
+
+  def create(self, environment):
+    subprocess.run(
+      [ self.interpreter(environment.version), "-m", "venv", str(environment.path) ],
+      capture_output=True, text=True, check=True
+    )
+
+class Uv(Venv):
+  def create(self, environment):
+    subprocess.run(
+      [ "uv", "venv", "--quiet", "--python", environment.version, str(environment.path) ],
+      capture_output=True, text=True, check=True
+    )
+
+  def pip(self, environment, inspected, *args):
+    # uv doesn't prompt when uninstalling
+    args = [ arg for arg in args if arg != "--yes" ]
+    return [ "uv", "pip", *args, "--python", str(environment.python), "--quiet" ]
+
+BACKENDS = { "pyenv" : Pyenv, "venv" : Venv, "uv" : Uv }
+
+class Environment():
+  """
+  A virtual environment with the requirements it should provide, and those it
+  provided before.
+  """
+  def __init__(self, name, requirements, backend, version=None, previous=None):
+    self.name         = name
+    self.requirements = list(requirements or [])
+    self.previous     = list(previous or [])
+    self.backend      = backend
+    self.version      = version
+    self.path         = backend.path(name)
+
+  def __repr__(self):
+    return f"Environment({self.name!r}, {str(self.path)!r})"
+
+  @property
+  def python(self):
+    if os.name == "nt":
+      return self.path / "Scripts" / "python.exe"
+    return self.path / "bin" / "python"
+
+  def exists(self):
+    return self.python.exists()
+
+  def create(self):
+    """
+    Creates the environment, unless it already exists.
+    """
+    result = self._result()
+    if self.exists():
+      return result
+    try:
+      self.backend.create(self)
+      result["created"] = True
+    except (OSError, LookupError, subprocess.CalledProcessError) as e:
+      self._failed(result, "creating", e)
+    return result
+
+  def inspect(self):
+    """
+    Returns the installed distributions, by canonical name, and the markers of
+    the environment.
+    """
+    from packaging.utils import canonicalize_name
+    result = subprocess.run(
+      [ str(self.python), "-c", INSPECT ],
+      capture_output=True, text=True, check=True
+    )
+    found = json.loads(result.stdout)
+    found["installed"] = {
+      canonicalize_name(name) : version for name, version in found["installed"].items()
+    }
+    return found
+
+  def synced(self):
+    """
+    Returns the canonical names of the requirements of the previous sync.
+    """
+    try:
+      with open(self.path / STATE, encoding="utf-8") as fp:
+        return json.load(fp)["requirements"]
+    except (OSError, ValueError, KeyError):
+      return []
+
+  def plan(self, inspected):
+    """
+    Returns the requirements to install and the packages to uninstall.
+    """
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    installed = inspected["installed"]
+    required  = []
+    install   = []
+    for dep in self.requirements:
+      try:
+        requirement = Requirement(dep)
+      except InvalidRequirement:
+        logger.warning(f"⚠️  can't parse dependency : {dep}")
+        continue
+      if requirement.marker and \
+         not requirement.marker.evaluate(inspected["markers"]):
+        continue
+      name = canonicalize_name(requirement.name)
+      required.append(name)
+      version = installed.get(name, None)
+      if version is None or \
+         (not requirement.url and
+          not requirement.specifier.contains(version, prereleases=True)):
+        install.append(dep)
+    # packages that were required before, according to the previous sync, or
+    # the previous requirements, if the environment was never synced
+    before = list(self.synced())
+    for dep in self.previous:
+      try:
+        before.append(canonicalize_name(Requirement(dep).name))
+      except InvalidRequirement:
+        continue
+    uninstall = []
+    for name in before:
+      if name not in required and name in installed and name not in uninstall:
+        uninstall.append(name)
+    return install, uninstall, required
+
+  def sync(self, find_links=None):
+    """
+    Installs and uninstalls the difference between the requirements and the
+    installed packages, optionally also finding packages in a folder.
+    """
+    result = self._result()
+    try:
+      inspected = self.inspect()
+      install, uninstall, required = self.plan(inspected)
+      if uninstall:
+        self._run(self.backend.pip(self, inspected, "uninstall", "--yes", *uninstall))
+        result["uninstalled"] = uninstall
+      if install:
+        options = [ "--find-links", str(find_links) ] if find_links else []
+        self._run(self.backend.pip(self, inspected, "install", *options, *install))
+        result["installed"] = install
+      with open(self.path / STATE, "w", encoding="utf-8") as fp:
+        json.dump({ "requirements" : required }, fp)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+      self._failed(result, "syncing", e)
+    return result
+
+  def _result(self):
+    return {
+      "environment" : self.name,
+      "path"        : str(self.path),
+      "created"     : False,
+      "installed"   : [],
+      "uninstalled" : [],
+      "ok"          : True,
+      "error"       : None
+    }
+
+  def _failed(self, result, action, e):
+    error = (getattr(e, "stderr", None) or str(e)).strip()
+    logger.error(f"🛑 {action} {self.name} failed: {error}")
+    result["ok"]    = False
+    result["error"] = error
+
+  def _run(self, command):
+    subprocess.run(command, capture_output=True, text=True, check=True)
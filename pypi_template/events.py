@@ -0,0 +1,62 @@
+"""
+Streaming machine-readable events, as newline-delimited JSON.
+
+When enabled, using the `events` command, every step of e.g. `apply`,
+`status`, `check` or a `fleet` run is written to stdout as it happens, as one
+JSON object per line, with an `event` key and event specific fields:
+
+* `rendered`     : a template was rendered (`filename`, `state`, `bytes`)
+* `unchanged`    : a file has no changes (`filename`, `reason` = lock/content)
+* `skipped`      : a file or folder isn't rendered (`filename`, `entry`)
+* `backed-up`    : a changed file was backed up (`filename`, `backup`)
+* `written`      : a file was written (`filename`, `bytes`)
+* `check-failed` : a check failed (`check`, and e.g. `filename` and `state`)
+* `timing`       : a phase took some time (`phase`, `template`, `duration`, `bytes`)
+* `project`      : a fleet project was handled (the fleet result fields)
+* `result`       : the final result of a command (`command`, `data`)
+
+Events of fleet projects, emitted by worker processes, include their `project`.
+
+  Example of usage:
+
+      % pypi-template events fleet apply "~/Workspace/*" | jq -c 'select(.event == "written")'
+"""
+
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+class Events():
+  """
+  Writes events as JSON lines to a stream, by default the current stdout.
+  """
+  def __init__(self, stream=None, **context):
+    self._stream  = stream
+    self._context = context
+    self._lock    = threading.Lock()
+
+  def emit(self, event, **fields):
+    line = json.dumps({ "event" : event, **self._context, **fields }, default=str)
+    stream = self._stream or sys.stdout
+    # one write per line, so lines of concurrent writers don't interleave
+    with self._lock:
+      stream.write(line + "\n")
+      stream.flush()
+
+  @contextmanager
+  def measure(self, phase, template=None, timings=None):
+    """
+    Measures a phase, like `Timings.measure`, also recording it in the given
+    timings, and emits a timing event.
+    """
+    start = time.perf_counter()
+    with timings.measure(phase, template) if timings else nullcontext({ "bytes" : 0 }) as sample:
+      try:
+        yield sample
+      finally:
+        self.emit(
+          "timing", phase=phase, template=template,
+          duration=time.perf_counter() - start, bytes=sample["bytes"]
+        )
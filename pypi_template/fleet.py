@@ -0,0 +1,158 @@
+"""
+Little submodule for managing a fleet of projects. Runs `save`, `apply`,
+`status` or `check` on many project roots at once, using a pool of processes.
+
+  Examples of usage:
+
+      % pypi-template fleet apply "~/Workspace/*"
+      % pypi-template force fleet save ~/Workspace/one ~/Workspace/two
+      % pypi-template json fleet status "~/Workspace/*" --workers=8
+      % pypi-template events fleet check "~/Workspace/*"
+
+Project roots are folders containing a `.pypi-template` file. They can be given
+as paths or glob patterns. Templates are compiled once, in the parent process,
+which fills the persistent bytecode cache. Each worker process then loads them
+once and shares them across all projects it handles that use the same layers.
+With `events`, the events of all projects and the result of each project are
+streamed as they happen.
+"""
+
+import os
+import glob
+
+import logging
+logger = logging.getLogger(__name__)
+
+COMMANDS = [ "save", "apply", "status", "check" ]
+
+# per worker process state: the options of the parent and the environment and
+# compiled templates, which are shared across all projects with the same layers
+_options = {}
+_shared  = {}
+
+class Fleet:
+  def __init__(self, pypi_template):
+    self._pypi_template = pypi_template
+
+  def save(self, *roots, workers=None):
+    """
+    Saves the variables of all projects.
+    """
+    return self._run("save", roots, workers)
+
+  def apply(self, *roots, workers=None):
+    """
+    Applies the templates to all projects.
+    """
+    return self._run("apply", roots, workers)
+
+  def status(self, *roots, workers=None):
+    """
+    Performs sanity checks on all projects.
+    """
+    return self._run("status", roots, workers)
+
+  def check(self, *roots, workers=None):
+    """
+    Checks that the generated files of all projects are up to date.
+    """
+    return self._run("check", roots, workers)
+
+  def _run(self, command, roots, workers=None):
+    roots = projects(roots)
+    if not roots:
+      logger.warning("🚨 no projects found")
+      return self._pypi_template._result(f"fleet {command}", [])
+    self._pypi_template._being_verbose(
+      f"🚀 running {command} on {len(roots)} projects"
+    )
+    # compile all templates once, which fills the persistent bytecode cache
+    self._pypi_template._preload("_templates")
+    from pypi_template.options import Options
+    options = {
+      "options" : Options(
+        verbose = self._pypi_template._be_verbose,
+        force   = self._pypi_template._force,
+        debug   = self._pypi_template._show_debug,
+        yes     = self._pypi_template._say_yes_to_all,
+        offline = self._pypi_template._offline,
+        workers = self._pypi_template._workers
+      ),
+      "events"  : bool(self._pypi_template._events)
+    }
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(
+      max_workers=workers, initializer=_initialize, initargs=(options,)
+    ) as executor:
+      # report each project as soon as it is handled, summarize in order
+      futures = [ executor.submit(_run, command, root) for root in roots ]
+      for future in as_completed(futures):
+        self._pypi_template._emit("project", **future.result())
+      summary = [ future.result() for future in futures ]
+    failed = [ result["path"] for result in summary if not result["ok"] ]
+    if failed:
+      logger.warning(f"🚨 {command} failed on {len(failed)} projects")
+      if command == "check":
+        self._pypi_template._exit_code = 1
+    return self._pypi_template._result(f"fleet {command}", summary)
+
+def projects(roots):
+  """
+  Expands paths and glob patterns to a sorted list of project roots.
+  """
+  found = []
+  for root in roots:
+    for path in sorted(glob.glob(os.path.expanduser(str(root)))):
+      path = os.path.abspath(path)
+      if os.path.isfile(os.path.join(path, ".pypi-template")) and \
+         path not in found:
+        found.append(path)
+  return found
+
+def _initialize(options):
+  _options.update(options)
+  _shared.clear()
+
+def _project(path):
+  from pypi_template import PyPiTemplate
+  project = PyPiTemplate(root=path, options=_options["options"])
+  if _options["events"]:
+    from pypi_template.events import Events
+    project._events = Events(project=path)
+  # the environment depends on the project's layers, so share it per set of
+  # layers, until any of their templates changes
+  from pypi_template.daemon import fingerprint
+  key     = tuple(str(layer.root) for layer in project._layers)
+  current = fingerprint(project._layers)
+  state   = _shared.get(key, None)
+  if state is None or state["fingerprint"] != current:
+    state = {
+      "fingerprint" : current,
+      "attributes"  : {
+        "_manifest"    : project._manifest,
+        "_environment" : project._environment,
+        "_templates"   : project._templates
+      }
+    }
+    _shared[key] = state
+  for attribute, value in state["attributes"].items():
+    setattr(project, attribute, value)
+  return project
+
+def _run(command, path):
+  result = { "path" : path, "command" : command, "ok" : True, "error" : None }
+  try:
+    project = _project(path)
+    getattr(project, command)()
+    if command == "apply":
+      result["written"] = project._written
+    elif command == "status":
+      result["ok"] = project._healthy
+    elif command == "check":
+      result["ok"]      = project._healthy
+      result["drifted"] = project._drifted
+  except Exception as e:
+    logger.error(f"🛑 {command} failed on {path}: {e}")
+    result["ok"]    = False
+    result["error"] = str(e)
+  return result
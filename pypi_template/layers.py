@@ -0,0 +1,160 @@
+"""
+Layered template sources.
+
+On top of the built-in templates, additional layers of templates can be added,
+e.g. with organisation-specific files. Later layers override earlier ones, per
+file. A layer is either a folder, e.g. a user- or org-level folder or a local
+git checkout, or a folder in an installed (plugin) package, given as
+`package:<module>` (using its `templates` folder) or `package:<module>/<folder>`.
+
+Layers are taken, in this order, from
+* the `PYPI_TEMPLATE_LAYERS` environment variable (separated by `:`)
+* `layers` in your personal `~/.pypi-template`
+* `layers` in the project's `.pypi-template`
+
+The index of each layer, with the digest, variables and references of each of
+its templates, is cached and only rebuilt when the fingerprint of the layer,
+based on the name, size and modification time of its files, changes.
+"""
+
+import os
+from pathlib import Path
+
+from pypi_template.cache    import LayersCache, VariablesCache, digest
+from pypi_template.manifest import EXCLUDED, analyse, name
+
+import logging
+logger = logging.getLogger(__name__)
+
+PACKAGE = "package:"
+IGNORED = [ ".git", "__pycache__" ]
+
+def from_environment():
+  """
+  Returns the layers configured in the environment.
+  """
+  return [
+    spec for spec in os.environ.get("PYPI_TEMPLATE_LAYERS", "").split(os.pathsep)
+    if spec
+  ]
+
+class Layer():
+  """
+  A folder with templates.
+  """
+  def __init__(self, spec, root=None):
+    # relative folders are relative to the given root, or the cwd
+    self.spec    = spec
+    self.root    = self._resolve(spec, root)
+    self.package = None
+    if spec.startswith(PACKAGE):
+      module, _, folder = spec[len(PACKAGE):].partition("/")
+      self.package = ".".join([ module, *(folder or "templates").split("/") ])
+
+  def __repr__(self):
+    return f"Layer({self.spec!r})"
+
+  def _resolve(self, spec, root=None):
+    if spec.startswith(PACKAGE):
+      import importlib_resources
+      module, _, folder = spec[len(PACKAGE):].partition("/")
+      return Path(str(importlib_resources.files(module).joinpath(folder or "templates")))
+    return (Path(root or ".") / Path(spec).expanduser()).resolve()
+
+  def resources(self):
+    """
+    Returns all template resources in the layer.
+    """
+    if not self.root.is_dir():
+      raise FileNotFoundError(f"{self.root} is not a folder")
+    found = []
+    for folder, folders, filenames in os.walk(self.root):
+      folders[:] = sorted(f for f in folders if f not in IGNORED)
+      for filename in filenames:
+        resource = Path(os.path.relpath(os.path.join(folder, filename), self.root)).as_posix()
+        if not self._excluded(resource):
+          found.append(resource)
+    return sorted(found)
+
+  def _excluded(self, resource):
+    # compiled files and, in packages, the markers that make folders packages,
+    # as for the built-in templates
+    if resource.endswith(".pyc"):
+      return True
+    if self.package is None:
+      return False
+    return resource == "__init__.py" or \
+           f"{self.package}.{resource.replace('/', '.')}" in EXCLUDED
+
+  def read(self, resource):
+    """
+    Returns the content of a resource as bytes.
+    """
+    return (self.root / resource).read_bytes()
+
+  def fingerprint(self, resources):
+    """
+    Returns a fingerprint of the layer, based on its files' name, size and
+    modification time.
+    """
+    entries = []
+    for resource in resources:
+      stat = (self.root / resource).stat()
+      entries.append(f"{resource}:{stat.st_size}:{stat.st_mtime_ns}")
+    return digest("\n".join(entries))
+
+  def loader(self):
+    """
+    Returns a Jinja loader for the layer.
+    """
+    from jinja2 import FileSystemLoader
+    return FileSystemLoader(str(self.root))
+
+  def index(self, environment, layers_cache, variables_cache, timed):
+    """
+    Returns the templates in the layer, by name, with their resource, digest,
+    variables and references, from the cache, if the layer didn't change.
+    """
+    key          = str(self.root)
+    resources    = self.resources()
+    fingerprint  = self.fingerprint(resources)
+    templates    = layers_cache.get(key, fingerprint)
+    if templates is not None:
+      return templates
+    logger.debug(f"🔎 indexing template layer {self.spec}")
+    templates = {}
+    for resource in resources:
+      source        = self.read(resource)
+      source_digest = digest(source)
+      found         = variables_cache.get(f"{key}:{resource}", source_digest)
+      if found is None:
+        with timed("parse", name(resource)) as sample:
+          found = analyse(environment, source)
+          sample["bytes"] = len(source)
+        variables_cache.set(f"{key}:{resource}", source_digest, **found)
+      templates[name(resource)] = {
+        "resource" : resource,
+        "name"     : name(resource),
+        "digest"   : source_digest,
+        "layer"    : self.spec,
+        **found
+      }
+    layers_cache.set(key, fingerprint, templates)
+    return templates
+
+def merge(builtin, layers, environment, timed):
+  """
+  Merges the index of the built-in templates with those of all layers, later
+  layers overriding earlier ones.
+  """
+  merged          = dict(builtin)
+  layers_cache    = LayersCache()
+  variables_cache = VariablesCache()
+  for layer in layers:
+    try:
+      merged.update(layer.index(environment, layers_cache, variables_cache, timed))
+    except OSError as e:
+      logger.warning(f"🚨 skipping template layer {layer.spec}: {e}")
+  layers_cache.save()
+  variables_cache.save()
+  return merged
@@ -0,0 +1,107 @@
+"""
+Lock file recording the state of the last `apply`.
+
+The lock, `.pypi-template.lock` in the root of the project, keeps the values of
+all variables that were used to render the templates and, for each generated
+file, a digest of the template(s) it was rendered from and the size,
+modification time and digest of its content. This allows `apply` to only
+re-render the files that are affected by changed variables or templates, or
+that were changed on disk since.
+"""
+
+import os
+import json
+
+from pypi_template import __version__
+from pypi_template.util import file_digest
+
+LOCK = ".pypi-template.lock"
+
+class Lock():
+  """
+  The variables and output states of an apply.
+  """
+  def __init__(self, variables=None, outputs=None, version=__version__, root=None):
+    self.version   = version
+    self.variables = variables or {}
+    self.outputs   = outputs   or {}
+    self.root      = root  # of the project, None for the cwd
+
+  def _path(self, filename):
+    return os.path.join(self.root, filename) if self.root else filename
+
+  @classmethod
+  def load(cls, path=LOCK, root=None):
+    """
+    Returns the lock of the last apply, or None if there is none (for the
+    current version).
+    """
+    try:
+      with open(os.path.join(root, path) if root else path, encoding="utf-8") as fp:
+        lock = cls(**json.load(fp), root=root)
+    except (OSError, ValueError, TypeError):
+      return None
+    if lock.version != __version__:
+      return None
+    return lock
+
+  def save(self, path=LOCK):
+    """
+    Writes the lock, replacing the previous one atomically.
+    """
+    path = self._path(path)
+    tmp  = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+      json.dump({
+        "version"   : self.version,
+        "variables" : self.variables,
+        "outputs"   : self.outputs
+      }, fp, indent=2, sort_keys=True, default=str)
+      fp.write("\n")
+    os.replace(tmp, path)
+
+  def changed_variables(self, variables):
+    """
+    Returns the names of the variables that have a different value than the
+    locked ones.
+    """
+    names = set(variables) | set(self.variables)
+    return {
+      name for name in names
+      if name not in variables or name not in self.variables or
+         variables[name] != self.variables[name]
+    }
+
+  def record(self, filename, template_digest, content_digest=None):
+    """
+    Records the state of a generated file, using the digest of its content if
+    it is already known.
+    """
+    stat = os.stat(self._path(filename))
+    self.outputs[filename] = {
+      "template" : template_digest,
+      "size"     : stat.st_size,
+      "mtime"    : stat.st_mtime_ns,
+      "digest"   : content_digest or file_digest(self._path(filename))
+    }
+
+  def unchanged(self, filename, template_digest):
+    """
+    Checks if a generated file is still as it was recorded, comparing size and
+    modification time first and only computing a digest if it was touched.
+    """
+    recorded = self.outputs.get(filename, None)
+    if not recorded or recorded["template"] != template_digest:
+      return False
+    try:
+      stat = os.stat(self._path(filename))
+    except OSError:
+      return False
+    if stat.st_size != recorded["size"]:
+      return False
+    if stat.st_mtime_ns == recorded["mtime"]:
+      return True
+    if file_digest(self._path(filename)) != recorded["digest"]:
+      return False
+    recorded["mtime"] = stat.st_mtime_ns
+    return True
@@ -0,0 +1,70 @@
+"""
+Bounded recording of log messages and pluggable log sinks.
+
+Nothing is recorded by default. Log messages can be recorded, as structured
+dicts, in a `Recorder`, which keeps at most a given number of the most recent
+ones, e.g. to send them to the client of the daemon. Structured log messages
+can also be sent to a sink of your own: a `logging.Handler` subclass, given as
+`<module>:<class>` in the `PYPI_TEMPLATE_LOG_SINK` environment variable, which
+is added when `pypi-template` is used as a command line tool.
+
+Importing pypi_template never installs any logging handlers, that is left to
+the command line tool, or to the application using it as a library.
+"""
+
+import os
+from collections import deque
+
+import logging
+
+# fields of a log record that are recorded
+FIELDS = [
+  "name", "levelno", "levelname", "pathname", "filename", "module", "lineno",
+  "funcName", "created"
+]
+
+def structured(record):
+  """
+  Returns a log record as a JSON-serializable dict.
+  """
+  return {
+    **{ field : getattr(record, field) for field in FIELDS },
+    "msg" : record.getMessage()
+  }
+
+class Recorder(logging.Handler):
+  """
+  Records log messages as structured dicts, keeping at most `capacity` of the
+  most recent ones, or all of them if no capacity is given.
+  """
+  def __init__(self, capacity=None):
+    super().__init__()
+    self._records = deque(maxlen=capacity)
+    self.dropped  = 0
+
+  def emit(self, record):
+    if len(self._records) == self._records.maxlen:
+      self.dropped += 1
+    self._records.append(structured(record))
+
+  @property
+  def records(self):
+    return list(self._records)
+
+  def clear(self):
+    self._records.clear()
+    self.dropped = 0
+
+def sink(spec=None):
+  """
+  Returns a log handler, given as `<module>:<class>`, by default from
+  `PYPI_TEMPLATE_LOG_SINK`, or None.
+  """
+  spec = spec or os.environ.get("PYPI_TEMPLATE_LOG_SINK", None)
+  if not spec:
+    return None
+  if ":" not in spec:
+    raise ValueError(f"unknown log sink {spec}, use <module>:<class>")
+  import importlib
+  module, _, name = spec.partition(":")
+  return getattr(importlib.import_module(module), name)()
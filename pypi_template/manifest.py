@@ -0,0 +1,173 @@
+"""
+Manifest of all templates, generated at build time and shipped in the package.
+
+For each template it lists the resource, its name (with `(dot)` mapped to `.`),
+a digest of its content and the variables and templates that are referenced in
+it. Loading this manifest replaces walking the templates folder and parsing
+every template at startup. The `(package_module_name)` placeholder is kept in
+the name, since it depends on the project and is only resolved when rendering.
+
+Regenerate it after changing templates with:
+
+    % make manifest
+
+which is also done before building a distribution. When running from a source
+tree, a manifest that is out of date with the templates is detected and
+ignored, falling back to walking and parsing the templates.
+"""
+
+import os
+import json
+from pathlib import Path
+
+import importlib_resources
+
+from pypi_template import __version__
+from pypi_template.cache import digest
+
+import logging
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+EXCLUDED_EXT = ".pyc"
+EXCLUDED     = [
+  "__pycache__",
+  "pypi_template.templates.__init__.py",
+  "pypi_template.templates.(dot)github.__init__.py",
+  "pypi_template.templates.base.__init__.py",
+  "pypi_template.templates.docs._static.__init__.py"
+]
+
+def name(resource):
+  """
+  Maps a resource to the name of the template.
+  """
+  return resource.replace("(dot)", ".")
+
+def _excluded(package, resource):
+  return resource.endswith(EXCLUDED_EXT) or \
+         resource in EXCLUDED or \
+         f"{package}.{resource}" in EXCLUDED
+
+def walk(package="pypi_template.templates"):
+  """
+  Recursively lists all template resources in a package.
+  """
+  files = []
+  for entry in importlib_resources.files(package).iterdir():
+    resource = entry.name
+    if _excluded(package, resource):
+      pass
+    elif importlib_resources.files(package).joinpath(resource).is_dir():
+      subfiles = walk(f"{package}.{resource}")
+      files += [ os.path.join(resource, f) for f in subfiles ]
+    else:
+      files.append(resource)
+  return files
+
+def read(resource):
+  """
+  Returns the content of a template resource as bytes.
+  """
+  f = importlib_resources.files("pypi_template").joinpath("templates", resource)
+  return f.read_bytes()
+
+def analyse(environment, source):
+  """
+  Parses a template and returns the variables and templates it references.
+  """
+  from jinja2 import meta
+  ast = environment.parse(source.decode("utf-8"))
+  return {
+    "variables"  : sorted(meta.find_undeclared_variables(ast)),
+    "references" : sorted(
+      reference for reference in meta.find_referenced_templates(ast) if reference
+    )
+  }
+
+def build():
+  """
+  Builds the manifest by walking and parsing all templates.
+  """
+  from jinja2 import Environment
+  environment = Environment(keep_trailing_newline=True)
+  templates = []
+  for resource in sorted(walk()):
+    source = read(resource)
+    templates.append({
+      "resource"  : resource,
+      "name"      : name(resource),
+      "digest"    : digest(source),
+      **analyse(environment, source)
+    })
+  return { "version" : __version__, "templates" : templates }
+
+def write():
+  """
+  Builds and writes the manifest into the package.
+  """
+  path = importlib_resources.files("pypi_template").joinpath(MANIFEST)
+  manifest = build()
+  with open(path, "w", encoding="utf-8") as fp:
+    json.dump(manifest, fp, indent=2)
+    fp.write("\n")
+  return manifest
+
+def stale(manifest, folder, since):
+  """
+  Checks if a manifest, written at `since`, is out of date with the templates
+  in a folder: if templates were added or removed, or if templates that were
+  modified since have another digest.
+  """
+  found = {}
+  for root, folders, files in os.walk(folder):
+    package = ".".join([
+      "pypi_template", "templates",
+      *Path(os.path.relpath(root, folder)).parts
+    ])
+    folders[:] = [ name for name in folders if not _excluded(package, name) ]
+    for filename in files:
+      if not _excluded(package, filename):
+        path = os.path.join(root, filename)
+        found[Path(os.path.relpath(path, folder)).as_posix()] = path
+  digests = { template["resource"] : template["digest"] for template in manifest["templates"] }
+  if set(found) != set(digests):
+    return True
+  for resource, path in found.items():
+    if os.stat(path).st_mtime > since:
+      with open(path, "rb") as fp:
+        if digest(fp.read()) != digests[resource]:
+          return True
+  return False
+
+def _source_tree():
+  # the templates folder of a checkout, or None when installed
+  package = Path(__file__).resolve().parent
+  if (package.parent / "setup.py").is_file():
+    return package / "templates"
+  return None
+
+def load():
+  """
+  Returns the shipped manifest, or None if it is missing, was built for
+  another version or, in a source tree, is out of date with the templates.
+  """
+  path = importlib_resources.files("pypi_template").joinpath(MANIFEST)
+  try:
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+  except (OSError, ValueError):
+    logger.debug("🚨 no template manifest available")
+    return None
+  if manifest.get("version", None) != __version__:
+    logger.debug(f"🚨 ignoring template manifest for {manifest.get('version')}")
+    return None
+  templates = _source_tree()
+  if templates and stale(manifest, templates, os.stat(str(path)).st_mtime):
+    logger.debug("🚨 ignoring template manifest, templates changed, run 'make manifest'")
+    return None
+  return manifest
+
+if __name__ == "__main__":
+  manifest = write()
+  print(f"💾 wrote manifest with {len(manifest['templates'])} templates")
@@ -0,0 +1,36 @@
+"""
+Operational options of a run, the equivalent of the chainable option commands.
+"""
+
+class Options():
+  """
+  The options of a run: verbose, force, debug, yes, offline and the number of
+  rendering workers.
+  """
+  def __init__(self, verbose=False, force=False, debug=False, yes=False,
+                     offline=None, workers=None):
+    self.verbose = verbose
+    self.force   = force
+    self.debug   = debug
+    self.yes     = yes
+    self.offline = offline
+    self.workers = workers
+
+  def __repr__(self):
+    return "Options(" + ", ".join(
+      f"{key}={value!r}" for key, value in vars(self).items()
+    ) + ")"
+
+  @classmethod
+  def from_argv(cls, argv):
+    """
+    Returns the options found on a command line, looking forward for them,
+    before they are actually handled as commands.
+    """
+    return cls(
+      verbose = "verbose" in argv,
+      force   = "force"   in argv,
+      debug   = "debug"   in argv,
+      yes     = "yes"     in argv,
+      offline = "offline" in argv or None
+    )
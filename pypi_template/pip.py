@@ -8,6 +8,7 @@ Little submodule for managing dependencies. Mimics the pip interface. Commands w
      freeze              Output installed packages in requirements format.
      inspect             Inspect the python environment.
     +list                List installed packages.
+    +outdated            List dependencies that are behind on their latest version.
      show                Show information about installed packages.
      check               Verify installed packages have compatible dependencies.
      config              Manage local and global configuration.
@@ -19,14 +20,24 @@ Little submodule for managing dependencies. Mimics the pip interface. Commands w
      completion          A helper command used for command completion.
      debug               Show information useful for debugging.
      help                Show help for commands.
+
+Several packages can be (un)installed at once. Changes can also be batched, to
+apply them, and sync the environments, only once:
+
+    % pypi-template pip install requests rich
+    % pypi-template pip batch install requests - uninstall pytest --scope=test - commit
 """
 
 import logging
 logger = logging.getLogger(__name__)
 
+SCOPES = [ "requires", "test_requires" ]
+
 class Pip:
   def __init__(self, pypi_template):
     self._pypi_template = pypi_template
+    self._batch         = False   # collecting changes until commit
+    self._pending       = False   # collected changes that aren't applied yet
 
   def list(self, scope=None):
     """
@@ -37,37 +48,159 @@ class Pip:
       return
     return self._pypi_template._template_vars[scope]
 
-  def install(self, dep, scope=None):
+  def outdated(self, ttl=None, workers=None):
     """
-    Installs new package dependency.
+    Lists dependencies (in all scopes) whose specifier excludes the latest
+    version. Optionally set the time (in seconds) cached metadata is valid.
+    """
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    from pypi_template.pypi import PyPI, Offline
+
+    requirements = []
+    for scope in SCOPES:
+      for dep in self._pypi_template[scope] or []:
+        try:
+          requirements.append((scope, dep, Requirement(dep)))
+        except InvalidRequirement:
+          logger.warning(f"⚠️  can't parse {scope} dependency : {dep}")
+
+    # look up each package only once, concurrently
+    if ttl is None:
+      pypi = self._pypi_template._pypi
+    else:
+      pypi = PyPI(ttl=ttl, offline=self._pypi_template._offline)
+    names = sorted({ canonicalize_name(requirement.name) for _, _, requirement in requirements })
+
+    def latest(name):
+      try:
+        return pypi.latest_version(name)
+      except Offline as e:
+        logger.warning(f"🔌 {e}")
+        return None
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+      latest_versions = dict(zip(names, executor.map(latest, names)))
+
+    outdated = []
+    for scope, dep, requirement in requirements:
+      version = latest_versions[canonicalize_name(requirement.name)]
+      if version is None or \
+         requirement.specifier.contains(version, prereleases=True):
+        continue
+      logger.info(f"📦 {dep} is behind on latest version {version}")
+      outdated.append({
+        "scope"   : scope,
+        "package" : requirement.name,
+        "current" : str(requirement.specifier),
+        "latest"  : version
+      })
+    return self._pypi_template._out(outdated)
+
+  def install(self, *deps, scope=None):
+    """
+    Installs new package dependencies, replacing other versions of the same
+    packages. (chainable)
     """
     scope = self._scope(scope)
     if not scope:
-      return
-    deps = self._pypi_template[scope]
-    if dep in deps:
-      logger.warning(f"⚠️  {dep} is already installed")
-      return
-    logger.info(f"➕ installing new dependency : {dep}")
-    deps.append(dep)
-    self._pypi_template[scope] = deps
-    self._apply_and_reinstall()
+      return self
+    current = list(self._pypi_template[scope] or [])
+    changed = False
+    for dep in map(str, deps):
+      name = self._name(dep)
+      if name is None:
+        continue
+      index = self._index(current, name)
+      if index is None:
+        logger.info(f"➕ installing new dependency : {dep}")
+        current.append(dep)
+      elif current[index] == dep:
+        logger.warning(f"⚠️  {dep} is already installed")
+        continue
+      else:
+        logger.info(f"🔄 replacing dependency : {current[index]} -> {dep}")
+        current[index] = dep
+      changed = True
+    if changed:
+      self._pypi_template[scope] = current
+      self._changed()
+    return self
 
-  def uninstall(self, dep, scope=None):
+  def uninstall(self, *deps, scope=None):
     """
-    Uninstalls package dependency.
+    Uninstalls package dependencies, whatever their version. (chainable)
     """
     scope = self._scope(scope)
     if not scope:
-      return
-    deps = self._pypi_template[scope]
-    if dep not in deps:
-      logger.warning(f"⚠️  {dep} isn't installed")
-      return
-    logger.info(f"❌ uninstalling dependency : {dep}")
-    deps.remove(dep)
-    self._pypi_template[scope] = deps
-    self._apply_and_reinstall()
+      return self
+    current = list(self._pypi_template[scope] or [])
+    changed = False
+    for dep in map(str, deps):
+      name = self._name(dep)
+      if name is None:
+        continue
+      index = self._index(current, name)
+      if index is None:
+        logger.warning(f"⚠️  {dep} isn't installed")
+        continue
+      logger.info(f"❌ uninstalling dependency : {current[index]}")
+      del current[index]
+      changed = True
+    if changed:
+      self._pypi_template[scope] = current
+      self._changed()
+    return self
+
+  def batch(self):
+    """
+    Collects all following installs and uninstalls, to apply them at once, with
+    a final `commit`, e.g. `pip batch install a b - uninstall c - commit`.
+    (chainable)
+    """
+    self._batch = True
+    return self
+
+  def commit(self):
+    """
+    Applies all changes that were collected since `batch`.
+    """
+    self._batch = False
+    if self._pending:
+      self._pending = False
+      self._apply_and_sync()
+
+  def __str__(self):
+    # unapplied changes are reported by the template
+    return str(self._pypi_template)
+
+  def _name(self, dep):
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    try:
+      return canonicalize_name(Requirement(dep).name)
+    except InvalidRequirement:
+      logger.error(f"🛑 invalid dependency : {dep}")
+      return None
+
+  def _index(self, deps, name):
+    # the index of the dependency on the package with the canonical name
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    for index, dep in enumerate(deps):
+      try:
+        if canonicalize_name(Requirement(dep).name) == name:
+          return index
+      except InvalidRequirement:
+        continue
+    return None
+
+  def _changed(self):
+    if self._batch:
+      self._pending = True
+    else:
+      self._apply_and_sync()
 
   def _scope(self, scope):
     if scope == "test":
@@ -77,7 +210,7 @@ class Pip:
     logger.error(f"🛑 unknown scope {scope}")
     return None
 
-  def _apply_and_reinstall(self):
+  def _apply_and_sync(self):
     self._pypi_template.apply()
-    if self._pypi_template._going_to("👷‍♂️ reinstalling environments"):
-      self._pypi_template._make("reinstall")
+    if self._pypi_template._going_to("👷‍♂️ syncing environments"):
+      self._pypi_template._sync_environments()
@@ -0,0 +1,137 @@
+"""
+Cached, time-bounded client for the JSON API of a Python package index.
+
+Metadata of packages is kept in the persistent cache (see `cache.py`), per
+index, for a limited time (`PYPI_TEMPLATE_TTL`, default one hour). Stale entries are
+revalidated using their ETag, so an unchanged package costs a single, empty
+response. Requests use pooled sessions and a strict timeout
+(`PYPI_TEMPLATE_TIMEOUT`, default 5 seconds).
+
+In offline mode (`offline` command or `PYPI_TEMPLATE_OFFLINE=1`), no requests
+are made and only cached metadata, however old, is used. When online, but the
+index can't be reached, stale cached metadata is used as a fallback.
+
+The index can be changed with `PYPI_TEMPLATE_INDEX`, which defaults to
+`https://pypi.org/pypi`.
+"""
+
+import os
+import json
+import time
+import threading
+
+from pypi_template.cache import cache_dir, digest
+
+import logging
+logger = logging.getLogger(__name__)
+
+INDEX   = "https://pypi.org/pypi"
+TTL     = 60 * 60
+TIMEOUT = 5
+
+class Offline(Exception):
+  """
+  Raised when metadata is needed that isn't cached and can't be fetched.
+  """
+  pass
+
+class PyPI():
+  """
+  Fetches package metadata from an index, with on-disk caching.
+  """
+  def __init__(self, index=None, ttl=None, timeout=None, offline=None):
+    self.index   = (index or os.environ.get("PYPI_TEMPLATE_INDEX", INDEX)).rstrip("/")
+    self.ttl     = float(ttl if ttl is not None else
+                         os.environ.get("PYPI_TEMPLATE_TTL", TTL))
+    self.timeout = float(timeout if timeout is not None else
+                         os.environ.get("PYPI_TEMPLATE_TIMEOUT", TIMEOUT))
+    if offline is None:
+      offline = os.environ.get("PYPI_TEMPLATE_OFFLINE", "") not in [ "", "0" ]
+    self.offline = offline
+    self._local  = threading.local()
+    # metadata and ETags of one index are never used for another one
+    folder = cache_dir()
+    self._cache  = folder / "pypi" / digest(self.index)[:16] if folder else None
+
+  def latest_version(self, package):
+    """
+    Returns the latest version of a package, or raises Offline.
+    """
+    return self.metadata(package)["version"]
+
+  def metadata(self, package):
+    """
+    Returns the name, latest version and all released versions of a package,
+    from the cache if fresh enough, else from the index, or raises Offline.
+    """
+    from packaging.utils import canonicalize_name
+    name   = canonicalize_name(package)
+    cached = self._load(name)
+    if cached and (self.offline or time.time() - cached["fetched"] < self.ttl):
+      return cached["data"]
+    if self.offline:
+      raise Offline(f"no cached metadata for {package}")
+    try:
+      return self._fetch(name, cached)
+    except Exception as e:
+      if cached:
+        logger.warning(f"🚨 using cached metadata for {package}: {e}")
+        return cached["data"]
+      raise Offline(f"can't fetch metadata for {package}: {e}")
+
+  def _fetch(self, name, cached):
+    headers = {}
+    if cached and cached.get("etag", None):
+      headers["If-None-Match"] = cached["etag"]
+    response = self._session().get(
+      f"{self.index}/{name}/json", headers=headers, timeout=self.timeout
+    )
+    if response.status_code == 304:
+      cached["fetched"] = time.time()
+      self._save(name, cached)
+      return cached["data"]
+    response.raise_for_status()
+    metadata = response.json()
+    entry = {
+      "fetched" : time.time(),
+      "etag"    : response.headers.get("ETag", None),
+      "data"    : {
+        "name"     : metadata["info"]["name"],
+        "version"  : metadata["info"]["version"],
+        "releases" : sorted(metadata.get("releases", {}).keys())
+      }
+    }
+    self._save(name, entry)
+    return entry["data"]
+
+  def _session(self):
+    # one pooled session per thread
+    session = getattr(self._local, "session", None)
+    if session is None:
+      import requests
+      session = requests.Session()
+      adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+      session.mount("https://", adapter)
+      session.mount("http://", adapter)
+      self._local.session = session
+    return session
+
+  def _load(self, name):
+    if not self._cache:
+      return None
+    try:
+      return json.loads((self._cache / f"{name}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+      return None
+
+  def _save(self, name, entry):
+    if not self._cache:
+      return
+    try:
+      self._cache.mkdir(parents=True, exist_ok=True)
+      path = self._cache / f"{name}.json"
+      tmp  = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+      tmp.write_text(json.dumps(entry), encoding="utf-8")
+      os.replace(tmp, path)
+    except OSError as e:
+      logger.debug(f"🚨 can't cache metadata for {name}: {e}")
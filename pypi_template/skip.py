@@ -0,0 +1,137 @@
+"""
+Matching template paths against the `skip` list.
+
+Entries in the `skip` list follow the gitignore (gitwildmatch) syntax, except
+that plain entries, without glob characters, are relative to the root of the
+project, as they were before globs were supported:
+* `docs` skips the file or folder `docs` in the root, `docs/api` the one in
+  `docs`, use `**/docs` to skip a file or folder named `docs` at any level
+* `docs/` only skips folders
+* `*.md` matches at any level, `/*.md` and `docs/*.md` only relative to the root
+* `*` and `?` match anything but a `/`, `[...]` a set of characters
+* `**/` matches any number of folders, a trailing `/**` anything inside
+* `!` re-includes a path that was skipped by an earlier entry, but not if one
+  of its parent folders is skipped
+* empty entries and entries starting with `#` are ignored
+
+All entries are compiled into a single regular expression, with the entries in
+reverse order, so that the first alternative that matches is the last entry
+that applies, and the cost of checking a path hardly depends on the number of
+entries. Results for folders are remembered.
+"""
+
+import re
+import functools
+
+GLOB = re.compile(r"[*?\[]")
+
+def translate(glob):
+  """
+  Translates a gitwildmatch glob, without leading or trailing `/`, into a
+  regular expression.
+  """
+  parts = []
+  index = 0
+  while index < len(glob):
+    char = glob[index]
+    if glob.startswith("**/", index):
+      parts.append("(?:.*/)?")
+      index += 3
+    elif glob.startswith("/**", index) and index + 3 == len(glob):
+      parts.append("/.*")
+      index += 3
+    elif glob.startswith("**", index):
+      parts.append(".*")
+      index += 2
+    elif char == "*":
+      parts.append("[^/\\0]*")
+      index += 1
+    elif char == "?":
+      parts.append("[^/\\0]")
+      index += 1
+    elif char == "[" and glob.find("]", index + 2) > 0:
+      end   = glob.find("]", index + 2)
+      chars = glob[index + 1:end]
+      if chars.startswith("!"):
+        chars = "^" + chars[1:]
+      parts.append("[" + chars.replace("\\", "\\\\") + "]")
+      index = end + 1
+    elif char == "\\" and index + 1 < len(glob):
+      parts.append(re.escape(glob[index + 1]))
+      index += 2
+    else:
+      parts.append(re.escape(char))
+      index += 1
+  return "".join(parts)
+
+class SkipMatcher():
+  """
+  Compiled matcher for a list of skip entries.
+  """
+  def __init__(self, entries):
+    self.entries  = []
+    self._negated = []
+    alternatives  = []
+    for entry in entries:
+      pattern = str(entry).strip()
+      if not pattern or pattern.startswith("#"):
+        continue
+      negated = pattern.startswith("!")
+      if negated:
+        pattern = pattern[1:]
+      folder_only = pattern.endswith("/")
+      pattern     = pattern.rstrip("/")
+      anchored    = "/" in pattern or not GLOB.search(pattern)
+      pattern     = pattern.lstrip("/")
+      if not pattern:
+        continue
+      self.entries.append(str(entry).strip())
+      self._negated.append(negated)
+      alternatives.append(
+        ("" if anchored else "(?:.*/)?") + translate(pattern) +
+        ("\\0" if folder_only else "\\0?")
+      )
+    # last entry first, so the first matching alternative is the last entry
+    self._regex = None
+    if alternatives:
+      self._regex = re.compile(
+        "(?:" + "|".join(f"({alternative})" for alternative in reversed(alternatives)) + r")\Z",
+        re.DOTALL
+      )
+    self._folders = { "" : None }
+
+  def _match(self, path):
+    # the entry that skips a path (folders end with a NUL), or None
+    if self._regex is None:
+      return None
+    match = self._regex.match(path)
+    if not match:
+      return None
+    index = len(self.entries) - match.lastindex
+    return None if self._negated[index] else self.entries[index]
+
+  def folder(self, folder):
+    """
+    Returns the entry that skips a folder, or one of its parents, or None.
+    """
+    if folder not in self._folders:
+      parent, _, _ = folder.rpartition("/")
+      self._folders[folder] = self.folder(parent) or self._match(folder + "\0")
+    return self._folders[folder]
+
+  def file(self, filename):
+    """
+    Returns the entry that skips a file, or one of its folders, or None.
+    """
+    folder, _, _ = filename.rpartition("/")
+    return self.folder(folder) or self._match(filename)
+
+@functools.lru_cache(maxsize=16)
+def _compiled(entries):
+  return SkipMatcher(entries)
+
+def matcher(entries):
+  """
+  Returns a (cached) compiled matcher for a list of skip entries.
+  """
+  return _compiled(tuple(str(entry) for entry in entries or []))
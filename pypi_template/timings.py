@@ -0,0 +1,76 @@
+"""
+Per-phase timing instrumentation.
+
+When enabled, using the `timings` command, the duration and number of bytes of
+each phase (loading configuration, listing resources, compiling, rendering,
+comparing, writing,...) are recorded, both in total and per template. At the
+end of the run, they are reported as JSON. Optionally, a cProfile dump of the
+main thread can be written, for inspection with `pstats` or e.g. snakeviz.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+class Timings():
+  """
+  Accumulates durations and byte counts per phase and per template.
+  """
+  def __init__(self, profile=None):
+    self.phases    = {}
+    self.templates = {}
+    self._lock     = threading.Lock()
+    self._start    = time.perf_counter()
+    self._profile  = profile
+    self._profiler = None
+    if profile:
+      import cProfile
+      self._profiler = cProfile.Profile()
+      self._profiler.enable()
+
+  @contextmanager
+  def measure(self, phase, template=None):
+    """
+    Measures the duration of a phase, optionally for a template. The yielded
+    sample dict accepts a number of "bytes" that were processed.
+    """
+    sample = { "bytes" : 0 }
+    start  = time.perf_counter()
+    try:
+      yield sample
+    finally:
+      self._add(phase, template, time.perf_counter() - start, sample["bytes"])
+
+  def _add(self, phase, template, duration, size):
+    with self._lock:
+      targets = [ self.phases ]
+      if template is not None:
+        targets.append(self.templates.setdefault(template, {}))
+      for target in targets:
+        entry = target.setdefault(phase, { "duration" : 0.0, "calls" : 0, "bytes" : 0 })
+        entry["duration"] += duration
+        entry["calls"]    += 1
+        entry["bytes"]    += size
+
+  def stop(self):
+    """
+    Stops profiling, writing the profile if requested.
+    """
+    if self._profiler:
+      self._profiler.disable()
+      self._profiler.dump_stats(self._profile)
+      self._profiler = None
+
+  def report(self):
+    """
+    Returns all recorded timings.
+    """
+    self.stop()
+    report = {
+      "total"     : time.perf_counter() - self._start,
+      "phases"    : self.phases,
+      "templates" : self.templates
+    }
+    if self._profile:
+      report["profile"] = self._profile
+    return report
@@ -1,10 +1,21 @@
+import hashlib
 from pathlib import Path
 
-def file_content(path, default=None):
+def file_content(path, default=None, root=None):
   content = default
   try:
-    content = (Path.cwd() / path).read_text()
+    content = (Path(root or Path.cwd()) / path).read_text()
     content.strip()
   except FileNotFoundError:
     pass
   return content
+
+def file_digest(path, chunk_size=65536):
+  """
+  Returns a hex digest of the content of a file, reading it in chunks.
+  """
+  digest = hashlib.sha256()
+  with open(path, "rb") as fp:
+    for chunk in iter(lambda: fp.read(chunk_size), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
@@ -0,0 +1,250 @@
+"""
+Watching the inputs of a project for changes.
+
+The inputs of a project are its `.pypi-template`, `docs/summary.md` (the
+`summary` system variable), `.python_version` (the default `project_env`), the
+organisation-wide and personal defaults files and all template layers.
+
+On Linux, changes are picked up using inotify, through ctypes. Elsewhere, or
+when inotify isn't available, or an interval is given, the inputs are polled.
+"""
+
+import os
+import time
+import select
+import struct
+
+from pypi_template      import config
+from pypi_template.util import file_digest
+
+import logging
+logger = logging.getLogger(__name__)
+
+def inputs(project):
+  """
+  Returns the files and folders that are the inputs of a project.
+  """
+  files = [
+    project._path(".pypi-template"),
+    project._path("docs/summary.md"),
+    project._path(".python_version"),
+    *config.defaults_files()
+  ]
+  return (
+    [ os.path.abspath(path) for path in files ],
+    [ os.path.abspath(layer.root) for layer in project._layers ]
+  )
+
+def watcher(files, folders, interval=None):
+  """
+  Returns an inotify based watcher, or a polling one if inotify isn't
+  available or a polling interval is given.
+  """
+  if interval is None:
+    try:
+      return Inotify(files, folders)
+    except (OSError, AttributeError) as e:
+      logger.debug(f"🔎 inotify isn't available, polling: {e}")
+  return Poller(files, folders, interval or 0.5)
+
+class Watcher():
+  """
+  Base class of watchers of files and (recursively) folders.
+  """
+  def __init__(self, files, folders):
+    self.files    = set(files)
+    self.folders  = list(folders)
+    self._settled = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    pass
+
+  def relevant(self, path):
+    return path in self.files or any(
+      path == folder or path.startswith(folder + os.sep) for folder in self.folders
+    )
+
+  def settle(self, paths):
+    """
+    Ignores changes to files, e.g. written while applying, as long as they keep
+    their current content.
+    """
+    self._settled = { path : _digest(path) for path in paths }
+
+  def _unsettled(self, paths):
+    return {
+      path for path in paths
+      if path not in self._settled or _digest(path) != self._settled[path]
+    }
+
+  def wait(self, timeout=None):
+    """
+    Waits at most `timeout` seconds, or forever, for changes and returns the
+    changed paths, or an empty set on timeout.
+    """
+    raise NotImplementedError
+
+  def changes(self, debounce=0.2):
+    """
+    Waits for changes and returns the changed paths, once no more changes
+    happened for `debounce` seconds.
+    """
+    changed = set()
+    while not changed:
+      changed = self._unsettled(self.wait())
+    while True:
+      more = self.wait(debounce)
+      if not more:
+        return changed
+      changed |= self._unsettled(more)
+
+def _digest(path):
+  try:
+    return file_digest(path)
+  except OSError:
+    return None
+
+class Poller(Watcher):
+  """
+  Watches by comparing the size and modification time of all inputs.
+  """
+  def __init__(self, files, folders, interval=0.5):
+    super().__init__(files, folders)
+    self.interval  = interval
+    self._snapshot = self._take()
+
+  def _stat(self, path, snapshot):
+    try:
+      stat = os.stat(path)
+    except OSError:
+      return
+    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+  def _take(self):
+    snapshot = {}
+    for path in self.files:
+      self._stat(path, snapshot)
+    for root in self.folders:
+      for folder, _, filenames in os.walk(root):
+        for filename in filenames:
+          self._stat(os.path.join(folder, filename), snapshot)
+    return snapshot
+
+  def wait(self, timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+      snapshot = self._take()
+      changed  = {
+        path for path in set(snapshot) | set(self._snapshot)
+        if snapshot.get(path) != self._snapshot.get(path)
+      }
+      self._snapshot = snapshot
+      if changed:
+        return changed
+      if deadline is not None and time.monotonic() >= deadline:
+        return set()
+      pause = self.interval
+      if deadline is not None:
+        pause = min(pause, max(deadline - time.monotonic(), 0))
+      time.sleep(pause)
+
+# see inotify(7)
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_ISDIR       = 0x40000000
+MASK  = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+        IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+class Inotify(Watcher):
+  """
+  Watches the folders containing the inputs, using inotify.
+  """
+  def __init__(self, files, folders):
+    super().__init__(files, folders)
+    import ctypes
+    import ctypes.util
+    self._ctypes = ctypes
+    self._libc   = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    self._fd     = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if self._fd < 0:
+      raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    self._watches = {}
+    for path in self.files:
+      self._add(os.path.dirname(path))
+    for root in self.folders:
+      self._add_tree(root)
+
+  def _add(self, folder):
+    if folder in self._watches.values() or not os.path.isdir(folder):
+      return
+    wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), MASK)
+    if wd < 0:
+      logger.warning(f"🚨 can't watch {folder}: {os.strerror(self._ctypes.get_errno())}")
+      return
+    self._watches[wd] = folder
+
+  def _add_tree(self, root):
+    for folder, _, _ in os.walk(root):
+      self._add(folder)
+
+  def _existing(self, folder):
+    # relevant files that already exist in a newly watched folder
+    found = set()
+    for root, _, filenames in os.walk(folder):
+      found.update(
+        path for path in (os.path.join(root, name) for name in filenames)
+        if self.relevant(path)
+      )
+    return found
+
+  def close(self):
+    if self._fd >= 0:
+      os.close(self._fd)
+      self._fd = -1
+
+  def _events(self):
+    try:
+      data = os.read(self._fd, 64 * 1024)
+    except BlockingIOError:
+      return
+    offset = 0
+    while offset < len(data):
+      wd, mask, _, length = EVENT.unpack_from(data, offset)
+      offset += EVENT.size
+      name = data[offset:offset + length].rstrip(b"\0")
+      offset += length
+      if wd in self._watches:
+        yield os.path.join(self._watches[wd], os.fsdecode(name)), mask
+
+  def wait(self, timeout=None):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+      remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+      ready, _, _ = select.select([ self._fd ], [], [], remaining)
+      if not ready:
+        return set()
+      changed = set()
+      for path, mask in self._events():
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+          # e.g. a new folder in a layer, or the docs folder of summary.md
+          if self.relevant(path) or \
+             any(os.path.dirname(file) == path for file in self.files):
+            self._add_tree(path)
+            changed.update(self._existing(path))
+          continue
+        if self.relevant(path):
+          changed.add(path)
+      if changed:
+        return changed
@@ -0,0 +1,41 @@
+import pytest
+
+from pypi_template import PyPiTemplate
+
+from benchmarks.pypi_index import Index
+from tests.projects        import write_config
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+  # keep the persistent cache of each test private
+  monkeypatch.setenv("PYPI_TEMPLATE_CACHE", str(tmp_path / "cache"))
+  return tmp_path / "cache"
+
+@pytest.fixture
+def pypi_index(monkeypatch):
+  index = Index().start()
+  monkeypatch.setenv("PYPI_TEMPLATE_INDEX", index.url)
+  yield index
+  index.stop()
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+  # a project in the cwd
+  monkeypatch.chdir(write_config(tmp_path))
+  return tmp_path
+
+@pytest.fixture
+def applied(project):
+  # a project in the cwd, to which the templates were applied
+  PyPiTemplate().apply()
+  return project
+
+@pytest.fixture
+def make_projects(tmp_path):
+  # a factory of project roots, in a folder
+  def make(count, folder="fleet"):
+    return [
+      str(write_config(tmp_path / folder / f"project-{index}"))
+      for index in range(count)
+    ]
+  return make
@@ -0,0 +1,24 @@
+"""
+Helpers to set up projects, using the configuration of pypi-template itself.
+"""
+
+from pathlib import Path
+import shutil
+
+import yaml
+
+CONFIG = Path(__file__).resolve().parent.parent / ".pypi-template"
+
+def write_config(root, **values):
+  """
+  Creates a project root with the configuration of pypi-template itself,
+  optionally with some values changed, and returns it.
+  """
+  root.mkdir(parents=True, exist_ok=True)
+  if values:
+    config = yaml.safe_load(CONFIG.read_text())
+    config.update(values)
+    (root / ".pypi-template").write_text(yaml.safe_dump(config))
+  else:
+    shutil.copy(CONFIG, root / ".pypi-template")
+  return root
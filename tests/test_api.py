@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+import os
+
+from pypi_template import api
+from pypi_template.options import Options
+
+def test_render_returns_content_without_writing(make_projects, tmp_path, monkeypatch):
+  root, = [ Path(root) for root in make_projects(1) ]
+  monkeypatch.chdir(tmp_path)
+  files = api.render(root)
+  assert "pypi_template" in files["setup.py"]
+  assert "tox.ini" in files
+  assert "docs/index.md" not in files   # skipped
+  assert sorted(path.name for path in root.iterdir()) == [ ".pypi-template" ]
+
+def test_concurrent_apply_and_check_without_chdir(make_projects, tmp_path, monkeypatch):
+  roots = [ Path(root) for root in make_projects(4) ]
+  elsewhere = tmp_path / "elsewhere"
+  elsewhere.mkdir()
+  monkeypatch.chdir(elsewhere)
+  # options are explicit, not sniffed from the command line
+  monkeypatch.setattr(sys, "argv", [ "pypi-template", "debug" ])
+  with ThreadPoolExecutor(max_workers=4) as executor:
+    written = list(executor.map(api.apply, roots))
+  assert os.getcwd() == str(elsewhere)
+  assert list(elsewhere.iterdir()) == []
+  for root, files in zip(roots, written):
+    assert "setup.py" in files
+    assert (root / "setup.py").read_text() == api.render(root)["setup.py"]
+    assert (root / ".pypi-template.lock").is_file()
+  assert api.check(roots[0]) == []
+  (roots[0] / "tox.ini").unlink()
+  assert api.check(roots[0]) == [ "tox.ini" ]
+  assert api.check(roots[1], Options(force=True)) == []
+
+def test_template_state_is_shared(make_projects):
+  first, second = [ Path(root) for root in make_projects(2) ]
+  assert api.project(first)._environment is api.project(second)._environment
+  assert api.project(first)._template_info is api.project(second)._template_info
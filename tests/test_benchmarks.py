@@ -0,0 +1,25 @@
+import json
+
+from benchmarks.__main__ import compare, main
+
+def test_compare_reports_regressions_only():
+  baseline = {
+    "fast[1]"   : { "median" : 0.010 },
+    "slow[1]"   : { "median" : 0.010 },
+    "noise[1]"  : { "median" : 0.0001 }
+  }
+  results = {
+    "fast[1]"   : { "median" : 0.011 },
+    "slow[1]"   : { "median" : 0.020 },
+    "noise[1]"  : { "median" : 0.0005 },
+    "new[1]"    : { "median" : 1.0 }
+  }
+  assert list(compare(results, baseline, 1.25)) == [ "slow[1]" ]
+
+def test_suite_runs(tmp_path):
+  output = tmp_path / "results.json"
+  main(sizes=(5,), repeat=1, output=str(output))
+  results = json.loads(output.read_text())["results"]
+  assert "apply-full[builtin]" in results
+  assert "render-files[5]" in results
+  assert "status-warm[builtin]" in results
@@ -0,0 +1,38 @@
+import jinja2.meta
+
+import pypi_template.manifest
+from pypi_template import PyPiTemplate, __version__
+from pypi_template.cache import VariablesCache, cache_dir, digest
+
+def test_cache_is_keyed_on_version(isolated_cache):
+  assert cache_dir() == isolated_cache / __version__
+
+def test_cache_can_be_disabled(monkeypatch):
+  monkeypatch.setenv("PYPI_TEMPLATE_CACHE", "off")
+  assert cache_dir() is None
+  cache = VariablesCache()
+  cache.set("name", digest("content"), [ "var" ])
+  cache.save()
+  assert VariablesCache().get("name", digest("content")) is None
+
+def test_variables_cache_is_invalidated_on_content_change():
+  cache = VariablesCache()
+  cache.set("name", digest("content"), [ "var" ])
+  cache.save()
+  assert VariablesCache().get("name", digest("content"))["variables"] == [ "var" ]
+  assert VariablesCache().get("name", digest("changed")) is None
+
+def test_warm_runs_do_not_parse_templates(isolated_cache, monkeypatch):
+  # without a manifest, templates are walked and parsed
+  monkeypatch.setattr(pypi_template.manifest, "load", lambda: None)
+  cold = PyPiTemplate().variables
+  assert (isolated_cache / __version__ / "variables.json").is_file()
+
+  def fail(*args, **kwargs):
+    raise AssertionError("template was parsed")
+  monkeypatch.setattr(jinja2.meta, "find_undeclared_variables", fail)
+  assert PyPiTemplate().variables == cold
+
+def test_compiled_templates_are_cached(isolated_cache):
+  PyPiTemplate()._preload("_templates")
+  assert list((isolated_cache / __version__ / "bytecode").iterdir())
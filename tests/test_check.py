@@ -0,0 +1,67 @@
+from pathlib import Path
+import subprocess
+import sys
+import os
+
+import pytest
+
+from pypi_template import PyPiTemplate, api
+from pypi_template.lock import LOCK
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def snapshot(root):
+  return {
+    path : path.stat().st_mtime_ns for path in root.rglob("*")
+    if "cache" not in path.parts
+  }
+
+def test_check_passes_on_applied_project(applied):
+  before   = snapshot(applied)
+  template = PyPiTemplate()
+  assert template.check() == []
+  assert template._exit_code == 0
+  assert snapshot(applied) == before
+
+@pytest.mark.parametrize("lock", [ True, False ])
+def test_check_reports_drifted_files_without_writing(applied, lock):
+  if not lock:
+    (applied / LOCK).unlink()
+  (applied / "Makefile").write_text("changed\n")
+  (applied / "tox.ini").unlink()
+  before   = snapshot(applied)
+  template = PyPiTemplate()
+  assert template.check() == [ "Makefile", "tox.ini" ]
+  assert template._exit_code == 1
+  assert not template._healthy
+  assert snapshot(applied) == before
+
+def test_check_notices_changed_variables(applied):
+  (applied / ".pypi-template").write_text(
+    (applied / ".pypi-template").read_text().replace(
+      "package_name: pypi-template", "package_name: something-else"
+    )
+  )
+  assert "setup.py" in PyPiTemplate().check()
+
+def test_check_exits_non_zero(applied):
+  (applied / "Makefile").write_text("changed\n")
+  result = subprocess.run(
+    [ sys.executable, "-m", "pypi_template", "check" ],
+    capture_output=True, text=True,
+    env={ **os.environ, "PYTHONPATH" : str(ROOT), "PYPI_TEMPLATE_SOCKET" : "off" }
+  )
+  assert result.returncode == 1
+  assert result.stdout.split() == [ "Makefile" ]
+  assert "Makefile is out of date" in result.stderr
+
+def test_fleet_check(make_projects):
+  roots = make_projects(2)
+  for root in roots:
+    api.apply(root)
+  (Path(roots[1]) / "Makefile").write_text("changed\n")
+  template = PyPiTemplate()
+  summary  = template.fleet.check(*roots, workers=2)
+  assert [ result["ok"] for result in summary ] == [ True, False ]
+  assert summary[1]["drifted"] == [ "Makefile" ]
+  assert template._exit_code == 1
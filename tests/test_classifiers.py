@@ -0,0 +1,42 @@
+import json
+
+from prompt_toolkit.document import Document
+
+import importlib_resources
+
+from pypi_template import PyPiTemplate
+from pypi_template.classifiers import ClassifierIndex, INDEX, build, completer, source
+
+def test_shipped_index_is_up_to_date():
+  # if this fails, run `make manifest`
+  shipped = importlib_resources.files("pypi_template").joinpath(INDEX)
+  assert json.loads(shipped.read_text(encoding="utf-8")) == build(source())
+
+def test_search_matches_word_prefixes():
+  index = ClassifierIndex.load()
+  assert index.search("dev stat beta") == [ "Development Status :: 4 - Beta" ]
+  assert index.search("no such classifier") == []
+  assert len(index.search()) == len(index.classifiers)
+
+def test_search_by_level():
+  index = ClassifierIndex.load()
+  found = index.search("programming python", level=3)
+  assert "Programming Language :: Python :: 3.12" in found
+  assert "Programming Language :: Python" not in found
+  assert "Programming Language :: Python :: 3 :: Only" not in found
+  assert index.search("programming python", level=2) == [
+    "Programming Language :: Python"
+  ]
+
+def test_completer():
+  completions = completer(ClassifierIndex.load()).get_completions(
+    Document("license mit no attr"), None
+  )
+  assert [ c.text for c in completions ] == [
+    "License :: OSI Approved :: MIT No Attribution License (MIT-0)"
+  ]
+
+def test_classifiers_command():
+  assert PyPiTemplate().classifiers("typing", level=2) == [
+    "Typing :: Stubs Only", "Typing :: Typed"
+  ]
@@ -0,0 +1,81 @@
+import os
+
+import yaml
+import pytest
+
+from pypi_template import config, PyPiTemplate
+
+def test_load_and_save_roundtrip(tmp_path):
+  path = tmp_path / ".pypi-template"
+  config.save({ "package_name" : "test", "requires" : [ "a", "b" ] }, path)
+  assert config.load(path) == { "package_name" : "test", "requires" : [ "a", "b" ] }
+  assert list(tmp_path.iterdir()) == [ path ]
+
+def test_unchanged_files_are_parsed_once(tmp_path, monkeypatch):
+  path = tmp_path / ".pypi-template"
+  path.write_text("package_name: test\n")
+  assert config.load(path) == { "package_name" : "test" }
+  def fail(*args, **kwargs):
+    raise AssertionError("parsed again")
+  monkeypatch.setattr(yaml, "load", fail)
+  loaded = config.load(path)
+  loaded["package_name"] = "changed"
+  assert config.load(path) == { "package_name" : "test" }
+
+def test_changed_files_are_parsed_again(tmp_path):
+  path = tmp_path / ".pypi-template"
+  path.write_text("package_name: test\n")
+  assert config.load(path) == { "package_name" : "test" }
+  path.write_text("package_name: changed\n")
+  assert config.load(path) == { "package_name" : "changed" }
+
+def test_only_recently_used_files_are_kept(tmp_path, monkeypatch):
+  monkeypatch.setattr(config, "MAX_SNAPSHOTS", 2)
+  paths = []
+  for index in range(3):
+    paths.append(tmp_path / f"{index}.yaml")
+    paths[-1].write_text(f"index: {index}\n")
+  config.load(paths[0])
+  config.load(paths[1])
+  config.load(paths[0])
+  config.load(paths[2])
+  assert len(config._snapshots) <= 2
+  assert str(paths[0]) in config._snapshots
+  assert str(paths[1]) not in config._snapshots
+  assert config.load(paths[1]) == { "index" : 1 }
+
+def test_invalid_configuration_is_reported(tmp_path):
+  path = tmp_path / ".pypi-template"
+  path.write_text("- not\n- a mapping\n")
+  with pytest.raises(ValueError):
+    config.load(path)
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+  monkeypatch.setenv("HOME", str(tmp_path / "home"))
+  (tmp_path / "home").mkdir()
+  return tmp_path / "home"
+
+def test_organisation_defaults_are_overridden_by_personal_ones(tmp_path, home, monkeypatch):
+  org  = tmp_path / "org.yaml"
+  team = tmp_path / "team.yaml"
+  org.write_text("license: MIT\ngithub_account: org\nyour_name: nobody\n")
+  team.write_text("github_account: team\n")
+  (home / ".pypi-template").write_text("your_name: me\n")
+  monkeypatch.setenv("PYPI_TEMPLATE_DEFAULTS", os.pathsep.join([ str(org), str(team) ]))
+  assert config.defaults() == {
+    "license"        : "MIT",
+    "github_account" : "team",
+    "your_name"      : "me"
+  }
+  project = tmp_path / "project"
+  project.mkdir()
+  monkeypatch.chdir(project)
+  defaults = PyPiTemplate().defaults
+  assert defaults["github_account"] == "team"
+  assert defaults["your_name"] == "me"
+
+def test_broken_defaults_are_reported(home, caplog):
+  (home / ".pypi-template").write_text("your_name: [\n")
+  assert config.defaults() == {}
+  assert "ignoring defaults" in caplog.text
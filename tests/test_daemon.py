@@ -0,0 +1,80 @@
+import os
+import stat
+import threading
+import logging
+
+import pytest
+
+from pypi_template import PyPiTemplate
+from pypi_template.daemon import Daemon, forward, forwardable
+
+from tests.projects import write_config
+
+@pytest.fixture
+def daemon(tmp_path):
+  daemon = Daemon(tmp_path / "d.sock")
+  thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+  thread.start()
+  yield daemon
+  daemon.shutdown()
+  daemon.server_close()
+  thread.join()
+
+def test_only_known_commands_are_forwarded():
+  assert forwardable([ "verbose", "apply" ])
+  assert forwardable([ "json", "classifiers", "python", "--level=3" ])
+  assert not forwardable([ "edit", "all", "apply" ])
+  assert not forwardable([ "verbose" ])
+  assert not forwardable([])
+
+def test_without_daemon_commands_are_not_forwarded(project, tmp_path):
+  assert forward([ "variables" ], tmp_path / "missing.sock") is None
+
+def test_forwarded_commands_run_in_the_project(project, daemon, caplog):
+  caplog.set_level(logging.INFO)
+  response = forward([ "json", "variables" ], daemon.path)
+  assert response["code"] == 0
+  assert response["stdout"].strip() == PyPiTemplate().json().variables
+  response = forward([ "verbose", "apply" ], daemon.path)
+  assert response["code"] == 0
+  assert (project / "setup.py").is_file()
+  assert any("writing setup.py" in record["msg"] for record in response["log"])
+
+def test_template_state_is_kept_warm(project, daemon):
+  forward([ "apply" ], daemon.path)
+  (state,) = daemon._warm.values()
+  environment = state["attributes"]["_environment"]
+  forward([ "diff" ], daemon.path)
+  assert state["attributes"]["_environment"] is environment
+
+def test_changed_templates_invalidate_state(project, daemon, tmp_path):
+  org = tmp_path / "org"
+  org.mkdir()
+  (org / "ORG.md").write_text("one\n")
+  write_config(project, layers=[ str(org) ])
+  forward([ "apply" ], daemon.path)
+  assert (project / "ORG.md").read_text() == "one\n"
+  (org / "ORG.md").write_text("two, longer\n")
+  forward([ "apply" ], daemon.path)
+  assert (project / "ORG.md").read_text() == "two, longer\n"
+
+def test_changed_configuration_is_reloaded(project, daemon):
+  forward([ "apply" ], daemon.path)
+  write_config(project, package_name="something-else-entirely")
+  forward([ "apply" ], daemon.path)
+  assert "something-else-entirely" in (project / "setup.py").read_text()
+
+def test_a_second_daemon_is_refused(daemon):
+  with pytest.raises(RuntimeError):
+    Daemon(daemon.path)
+
+def test_the_socket_is_private_under_a_permissive_umask(tmp_path):
+  previous = os.umask(0o000)
+  try:
+    daemon = Daemon(tmp_path / "private.sock")
+  finally:
+    os.umask(previous)
+  try:
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+  finally:
+    daemon.server_close()
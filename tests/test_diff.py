@@ -0,0 +1,57 @@
+import json
+
+import pypi_template
+from pypi_template import PyPiTemplate
+
+def test_no_diff_for_unchanged_project(applied):
+  assert list(PyPiTemplate().diff()) == []
+
+def test_diff_shows_changes_without_writing(applied):
+  (applied / "Makefile").write_text("changed\n")
+  (applied / "tox.ini").unlink()
+  lines = list(PyPiTemplate().diff())
+  assert "--- a/Makefile" in lines
+  assert "-changed" in lines
+  assert "--- /dev/null" in lines
+  assert "+++ b/tox.ini" in lines
+  assert (applied / "Makefile").read_text() == "changed\n"
+  assert not (applied / "tox.ini").exists()
+
+def test_diff_reflects_unsaved_changes(applied):
+  template = PyPiTemplate()
+  template["requires"] = template["requires"] + [ "pathspec" ]
+  lines = list(template.diff())
+  assert "+++ b/requirements.txt" in lines
+  assert "+++ b/setup.py" in lines
+  assert "+pathspec" in lines
+
+def test_diff_as_json(applied):
+  (applied / "Makefile").write_text("changed\n")
+  results = [ json.loads(line) for line in PyPiTemplate().json().diff() ]
+  assert [ result["filename"] for result in results ] == [ "Makefile" ]
+  assert results[0]["state"] == "changed"
+  assert "-changed\n" in results[0]["diff"]
+
+def test_large_files_are_not_diffed(applied, monkeypatch):
+  monkeypatch.setattr(pypi_template, "MAX_DIFF_SIZE", 10)
+  (applied / "Makefile").write_text("changed\n")
+  lines = list(PyPiTemplate().diff())
+  assert lines[:2] == [ "--- a/Makefile", "+++ b/Makefile" ]
+  assert lines[2].startswith("files differ")
+
+def test_large_rendered_files_are_not_rendered_into_memory(applied, monkeypatch):
+  import jinja2
+  layer = applied / "layer"
+  layer.mkdir()
+  (layer / "LARGE.txt").write_text(
+    "{% for i in range(200000) %}line {{ i }}\n{% endfor %}"
+  )
+  with open(applied / ".pypi-template", "a") as fp:
+    fp.write(f"layers:\n- {layer}\n")
+  def fail(*args, **kwargs):
+    raise AssertionError("large template was rendered to a string")
+  monkeypatch.setattr(jinja2.Template, "render", fail)
+  results = [ json.loads(line) for line in PyPiTemplate().json().diff() ]
+  assert [ result["filename"] for result in results ] == [ "LARGE.txt" ]
+  assert results[0]["state"] == "new"
+  assert "new file" in results[0]["diff"]
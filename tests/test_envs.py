@@ -0,0 +1,191 @@
+import threading
+import logging
+import time
+import venv
+from pathlib import Path
+
+import pytest
+
+from pypi_template import PyPiTemplate, api
+from pypi_template.envs import STATE, Backend, Environment, Pyenv, discover, backend
+from pypi_template.options import Options
+
+from tests.wheels   import wheel
+from tests.projects import write_config
+
+@pytest.fixture
+def wheels(tmp_path, monkeypatch):
+  folder = tmp_path / "wheels"
+  folder.mkdir()
+  wheel(folder, "alpha", "1.0")
+  wheel(folder, "alpha", "2.0")
+  wheel(folder, "beta", "1.0", requires=[ "alpha>=1" ])
+  wheel(folder, "gamma", "1.0")
+  wheel(folder, "delta", "1.0")
+  for tool in [ "ruff", "tox", "coverage" ]:
+    wheel(folder, tool, "1.0")
+  monkeypatch.setenv("PIP_NO_INDEX", "1")
+  monkeypatch.setenv("PIP_FIND_LINKS", str(folder))
+  return folder
+
+class FastVenv(Backend):
+  """
+  Creates environments without pip, in a temporary folder, tracking how many
+  are created at the same time.
+  """
+  root    = None
+  active  = 0
+  maximum = 0
+  lock    = threading.Lock()
+
+  @property
+  def folder(self):
+    return self.root
+
+  def create(self, environment):
+    with FastVenv.lock:
+      FastVenv.active += 1
+      FastVenv.maximum = max(FastVenv.maximum, FastVenv.active)
+    time.sleep(0.1)
+    venv.create(environment.path, with_pip=False)
+    with FastVenv.lock:
+      FastVenv.active -= 1
+
+def installed(environment):
+  return environment.inspect()["installed"]
+
+def test_sync_only_installs_and_uninstalls_the_difference(tmp_path, wheels):
+  FastVenv.root = tmp_path
+  environment = Environment("run", [ "Beta", "alpha<2" ], FastVenv("demo"))
+  assert environment.create()["created"]
+  result = environment.sync()
+  assert result["ok"], result["error"]
+  assert result["installed"] == [ "Beta", "alpha<2" ]
+  assert installed(environment) == { "alpha" : "1.0", "beta" : "1.0" }
+
+  assert environment.sync()["installed"] == []
+
+  environment.requirements = [ "alpha>=2", "gamma; python_version < '3'" ]
+  result = environment.sync()
+  assert result["installed"] == [ "alpha>=2" ]
+  assert result["uninstalled"] == [ "beta" ]
+  assert installed(environment) == { "alpha" : "2.0" }
+
+def test_sync_reports_failures(tmp_path, wheels):
+  FastVenv.root = tmp_path
+  environment = Environment("run", [ "unknown" ], FastVenv("demo"))
+  environment.create()
+  result = environment.sync()
+  assert not result["ok"]
+  assert result["error"]
+
+def test_backends_are_pluggable(tmp_path, monkeypatch):
+  assert isinstance(backend("pyenv", "demo"), Pyenv)
+  assert isinstance(backend("tests.test_envs:FastVenv", "demo"), FastVenv)
+  monkeypatch.setenv("PYPI_TEMPLATE_BACKEND", "tests.test_envs:FastVenv")
+  assert isinstance(backend(), FastVenv)
+  with pytest.raises(ValueError):
+    backend("unknown")
+
+@pytest.fixture
+def project(tmp_path, monkeypatch, wheels):
+  root = tmp_path / "demo"
+  root.mkdir()
+  (root / ".pypi-template").write_text(
+    "requires:\n- beta\ntest_requires:\n- gamma\n"
+  )
+  (root / "requirements.docs.txt").write_text("# docs\ndelta\n")
+  monkeypatch.chdir(root)
+  return root
+
+def test_discover_finds_pyenv_environments(project, tmp_path, monkeypatch):
+  versions = tmp_path / "pyenv" / "versions"
+  for name in [ "demo-run", "demo-test-3.11", "other-run" ]:
+    venv.create(versions / name, with_pip=False)
+  monkeypatch.setenv("PYENV_ROOT", str(tmp_path / "pyenv"))
+  found = discover(Pyenv("demo"), [ "beta" ], [ "gamma" ])
+  assert [ (environment.name, environment.requirements) for environment in found ] == [
+    ("run",       [ "beta" ]),
+    ("test-3.11", [ "ruff", "tox", "coverage", "gamma" ])
+  ]
+
+def test_provision_and_sync(project, tmp_path, monkeypatch):
+  FastVenv.root    = tmp_path / "envs"
+  FastVenv.maximum = 0
+  monkeypatch.setenv("PYTHON_VERSIONS", "3.11 3.12")
+  backend = "tests.test_envs:FastVenv"
+
+  results = PyPiTemplate().provision(backend=backend)
+  assert [ (result["environment"], result["created"], result["installed"])
+           for result in results ] == [
+    ("run",       True, [ "beta" ]),
+    ("docs",      True, [ "delta" ]),
+    ("test-3.11", True, [ "ruff", "tox", "coverage", "gamma" ]),
+    ("test-3.12", True, [ "ruff", "tox", "coverage", "gamma" ])
+  ]
+  assert FastVenv.maximum > 1
+  assert any((tmp_path / "cache").rglob("beta-1.0-py3-none-any.whl"))
+
+  # provisioning again only installs what is missing
+  results = PyPiTemplate().provision(backend=backend)
+  assert [ result["created"] or result["installed"] for result in results ] == [ [] ] * 4
+
+  template = PyPiTemplate()
+  template["requires"] = [ "alpha<2" ]
+  results = template.sync(backend=backend)
+  assert [ result["environment"] for result in results ] == [
+    "run", "docs", "test-3.11", "test-3.12"
+  ]
+  assert (results[0]["installed"], results[0]["uninstalled"]) == ([ "alpha<2" ], [ "beta" ])
+  assert [ result["installed"] for result in results[1:] ] == [ [], [], [] ]
+
+def test_sync_uninstalls_previous_requirements_without_state(tmp_path, wheels):
+  FastVenv.root = tmp_path
+  environment = Environment("run", [ "beta" ], FastVenv("demo"))
+  environment.create()
+  environment.sync()
+  (environment.path / STATE).unlink()  # e.g. created by make install
+
+  environment = Environment("run", [ "alpha" ], FastVenv("demo"), previous=[ "Beta" ])
+  result = environment.sync()
+  assert result["uninstalled"] == [ "beta" ]
+  assert list(installed(environment)) == [ "alpha" ]
+
+def test_pip_uninstall_syncs_environments_without_state(project, tmp_path, monkeypatch):
+  write_config(project, requires=[ "beta" ], test_requires=[ "gamma" ])
+  FastVenv.root = tmp_path / "envs"
+  monkeypatch.setenv("PYPI_TEMPLATE_BACKEND", "tests.test_envs:FastVenv")
+  results = PyPiTemplate().provision()
+  for result in results:
+    (Path(result["path"]) / STATE).unlink()
+
+  PyPiTemplate(options=Options(yes=True)).pip.uninstall("beta")
+  run = Environment("run", [], FastVenv("demo"))
+  assert "beta" not in installed(run)
+
+def test_init_points_to_the_project_environment(project, monkeypatch, caplog):
+  caplog.set_level(logging.INFO)
+  template = PyPiTemplate()
+  provisioned = []
+  monkeypatch.setattr(template, "edit", lambda variable: template)
+  monkeypatch.setattr(template, "apply", lambda: None)
+  monkeypatch.setattr(template, "_provision_environments", lambda: provisioned.append(True))
+  template.init()
+  assert provisioned
+  assert "issue 'make env'" in caplog.text
+
+def test_environments_are_those_of_the_project_root(tmp_path, wheels, monkeypatch):
+  root = tmp_path / "other"
+  root.mkdir()
+  (root / ".pypi-template").write_text("requires:\n- beta\n")
+  (root / "requirements.docs.txt").write_text("delta\n")
+  (root / ".env").write_text("PYTHON_VERSIONS=3.11\n")
+  monkeypatch.delenv("PYTHON_VERSIONS", raising=False)
+  monkeypatch.chdir(tmp_path)
+  FastVenv.root = tmp_path / "envs"
+  results = api.project(root).provision(backend="tests.test_envs:FastVenv")
+  assert [ (result["path"], result["installed"]) for result in results ] == [
+    (str(tmp_path / "envs" / "other-run"),       [ "beta" ]),
+    (str(tmp_path / "envs" / "other-docs"),      [ "delta" ]),
+    (str(tmp_path / "envs" / "other-test-3.11"), [ "ruff", "tox", "coverage" ])
+  ]
@@ -0,0 +1,69 @@
+import json
+
+from pypi_template import PyPiTemplate
+
+def events(output):
+  return [ json.loads(line) for line in output.splitlines() if line ]
+
+def streaming():
+  return PyPiTemplate().events()
+
+def test_apply_streams_events(project, capsys):
+  streaming().apply()
+  first = events(capsys.readouterr().out)
+  kinds = { event["event"] for event in first }
+  assert { "rendered", "written", "skipped", "timing" } <= kinds
+  written = [ event["filename"] for event in first if event["event"] == "written" ]
+  assert "setup.py" in written
+  assert all(
+    event["bytes"] > 0 for event in first
+    if event["event"] == "written" and event["filename"] == "setup.py"
+  )
+  # rendering happens before writing
+  names = [ (event["event"], event.get("filename")) for event in first ]
+  assert names.index(("rendered", "setup.py")) < names.index(("written", "setup.py"))
+
+  (project / "setup.py").write_text("changed\n")
+  streaming().apply()
+  second = events(capsys.readouterr().out)
+  assert { "event" : "backed-up", "filename" : "setup.py", "backup" : "setup.py.backup" } in second
+  assert any(
+    event["event"] == "unchanged" and event["filename"] == "tox.ini"
+    for event in second
+  )
+
+def test_check_streams_failures_and_result(applied, capsys):
+  (applied / "tox.ini").unlink()
+  capsys.readouterr()
+  template = streaming()
+  assert template.check() is None
+  assert template._exit_code == 1
+  found = events(capsys.readouterr().out)
+  assert {
+    "event" : "check-failed", "check" : "drift", "filename" : "tox.ini", "state" : "new"
+  } in found
+  assert found[-1] == { "event" : "result", "command" : "check", "data" : [ "tox.ini" ] }
+
+def test_fleet_streams_project_events(make_projects, capfd):
+  roots = make_projects(2)
+  assert streaming().fleet.apply(*roots, workers=2) is None
+  found = events(capfd.readouterr().out)
+  for root in roots:
+    assert any(
+      event["event"] == "written" and event["project"] == root for event in found
+    )
+    assert any(
+      event["event"] == "project" and event["path"] == root and event["ok"]
+      for event in found
+    )
+  assert found[-1]["event"] == "result"
+  assert [ result["path"] for result in found[-1]["data"] ] == roots
+
+def test_status_only_streams_events(project, capsys):
+  template = streaming().offline()
+  template["requires"] = [ "pathspec" ]   # an unapplied change
+  assert template.status() is None
+  found = events(capsys.readouterr().out)
+  assert found[-1] == {
+    "event" : "result", "command" : "status", "data" : template._healthy
+  }
@@ -0,0 +1,56 @@
+from pathlib import Path
+import sys
+
+from pypi_template import PyPiTemplate
+from pypi_template.fleet import projects
+
+from tests.projects import write_config
+
+def test_projects_expands_globs_and_ignores_non_projects(make_projects, tmp_path):
+  roots = make_projects(3)
+  (tmp_path / "fleet" / "not-a-project").mkdir()
+  assert projects([ str(tmp_path / "fleet" / "*") ]) == roots
+  assert projects([ roots[0], roots[0] ]) == roots[:1]
+
+def test_fleet_apply(make_projects, tmp_path, monkeypatch):
+  roots = make_projects(3)
+  monkeypatch.chdir(tmp_path)
+  summary = PyPiTemplate().fleet.apply(str(tmp_path / "fleet" / "*"), workers=2)
+  assert [ result["path"] for result in summary ] == roots
+  for result in summary:
+    assert result["ok"]
+    assert "setup.py" in result["written"]
+    assert (Path(result["path"]) / "setup.py").is_file()
+
+def test_fleet_apply_reports_failures(make_projects, tmp_path, monkeypatch):
+  roots = make_projects(2)
+  (Path(roots[1]) / ".pypi-template").write_text("package_name: [")
+  monkeypatch.chdir(tmp_path)
+  summary = PyPiTemplate().fleet.apply(*roots, workers=2)
+  assert summary[0]["ok"]
+  assert not summary[1]["ok"]
+  assert summary[1]["error"]
+
+def test_fleet_does_not_share_layers_across_projects(make_projects, tmp_path, monkeypatch):
+  with_layer, without_layer = make_projects(2)
+  org = tmp_path / "org" / "(dot)github"
+  org.mkdir(parents=True)
+  (org / "README.md").write_text("ORG README {{ package_name }}\n")
+  write_config(Path(with_layer), layers=[ str(tmp_path / "org") ])
+  monkeypatch.chdir(tmp_path)
+  summary = PyPiTemplate().fleet.apply(with_layer, without_layer, workers=1)
+  assert all(result["ok"] for result in summary)
+  def readme(root):
+    return (Path(root) / ".github" / "README.md").read_text()
+  assert readme(with_layer).startswith("ORG README")
+  assert not readme(without_layer).startswith("ORG README")
+
+def test_fleet_options_come_from_the_parent(make_projects, tmp_path, monkeypatch):
+  roots = make_projects(1)
+  monkeypatch.chdir(tmp_path)
+  # workers don't look for options on the command line
+  monkeypatch.setattr(sys, "argv", [ "pypi-template", "debug" ])
+  template = PyPiTemplate()
+  template._show_debug = False
+  summary = template.fleet.apply(*roots, workers=1)
+  assert "setup.py" in summary[0]["written"]
@@ -0,0 +1,49 @@
+from pypi_template import PyPiTemplate
+from pypi_template.lock import LOCK, Lock
+
+def rendered(monkeypatch, template):
+  names = []
+  original = PyPiTemplate._template
+  def tracking(self, name):
+    names.append(name)
+    return original(self, name)
+  monkeypatch.setattr(PyPiTemplate, "_template", tracking)
+  template.apply()
+  return sorted(names)
+
+def test_apply_records_a_lock(applied):
+  lock = Lock.load()
+  assert (applied / LOCK).is_file()
+  assert "setup.py" in lock.outputs
+  assert lock.variables["package_name"] == "pypi-template"
+
+def test_unchanged_project_renders_nothing(applied, monkeypatch):
+  assert rendered(monkeypatch, PyPiTemplate()) == []
+
+def test_changed_variable_only_renders_affected_templates(applied, monkeypatch):
+  template = PyPiTemplate()
+  template["requires"] = template["requires"] + [ "pathspec" ]
+  assert rendered(monkeypatch, template) == [ "requirements.txt", "setup.py" ]
+  assert "pathspec" in (applied / "requirements.txt").read_text()
+
+def test_variables_of_extended_templates_are_tracked(applied, monkeypatch):
+  template = PyPiTemplate()
+  template["package_tagline"] = "something else"
+  assert rendered(monkeypatch, template) == [ ".github/README.md" ]
+
+def test_files_changed_on_disk_are_rendered(applied, monkeypatch):
+  (applied / "tox.ini").unlink()
+  (applied / "Makefile").write_text("changed")
+  assert rendered(monkeypatch, PyPiTemplate()) == [ "Makefile", "tox.ini" ]
+  assert (applied / "tox.ini").is_file()
+
+def test_force_renders_everything(applied, monkeypatch):
+  all_templates = rendered(monkeypatch, PyPiTemplate().force())
+  assert "setup.py" in all_templates
+  assert "Makefile" in all_templates
+
+def test_files_are_written_in_order(project):
+  template = PyPiTemplate()
+  expected = [ template._output_filename(name) for name in template._changed_files() ]
+  template.apply()
+  assert template._written == expected
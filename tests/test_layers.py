@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import pypi_template.layers
+from pypi_template import PyPiTemplate
+from pypi_template.layers   import Layer
+from pypi_template.manifest import walk
+
+from tests.projects import write_config
+
+def layer(root, files):
+  for name, content in files.items():
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+  return root
+
+@pytest.fixture
+def layered(tmp_path, monkeypatch):
+  # a project in the cwd, with an organisation layer
+  org = layer(tmp_path / "org", {
+    "(dot)github/README.md" : "# {{ package_name }} by {{ org_name }}\n",
+    "ORG.md"                : "{{ org_name }}\n"
+  })
+  root = write_config(tmp_path / "project", layers=[ str(org) ], org_name="ACME")
+  monkeypatch.chdir(root)
+  return root
+
+def test_layers_add_and_override_templates(layered):
+  template = PyPiTemplate()
+  assert "org_name" in template.variables
+  template.apply()
+  assert (layered / "ORG.md").read_text() == "ACME\n"
+  assert (layered / ".github" / "README.md").read_text() == "# pypi-template by ACME\n"
+  assert (layered / "setup.py").is_file()
+
+def test_later_layers_override_earlier_ones(layered, tmp_path, monkeypatch):
+  user = layer(tmp_path / "user", {
+    "ORG.md"  : "user {{ org_name }}\n",
+    "USER.md" : "user\n"
+  })
+  # the environment comes before the project's layers
+  monkeypatch.setenv("PYPI_TEMPLATE_LAYERS", str(user))
+  PyPiTemplate().apply()
+  assert (layered / "ORG.md").read_text() == "ACME\n"
+  assert (layered / "USER.md").read_text() == "user\n"
+
+def test_unchanged_layers_are_not_reindexed(layered, monkeypatch):
+  assert PyPiTemplate().variables
+  def fail(*args, **kwargs):
+    raise AssertionError("layer was indexed")
+  monkeypatch.setattr(pypi_template.layers, "analyse", fail)
+  assert "org_name" in PyPiTemplate().variables
+
+def test_changed_layers_are_reindexed(layered, tmp_path):
+  assert PyPiTemplate().variables
+  org = tmp_path / "org" / "ORG.md"
+  org.write_text("{{ other_name }}\n")
+  os.utime(org, ns=(0, 0))
+  assert "other_name" in PyPiTemplate().variables
+
+def test_missing_layers_are_skipped(layered, tmp_path, monkeypatch):
+  monkeypatch.setenv("PYPI_TEMPLATE_LAYERS", str(tmp_path / "missing"))
+  assert len(PyPiTemplate()._layers) == 1
+
+def test_package_layers():
+  docs = Layer("package:pypi_template/templates/docs")
+  assert "index.md" in docs.resources()
+
+def test_package_markers_are_not_templates(tmp_path, monkeypatch):
+  templates = tmp_path / "myorg" / "templates"
+  (templates / "docs").mkdir(parents=True)
+  (tmp_path / "myorg" / "__init__.py").write_text("")
+  (templates / "__init__.py").write_text("")
+  (templates / "ORG.md").write_text("{{ project }}\n")
+  (templates / "docs" / "__init__.py").write_text("")
+  monkeypatch.syspath_prepend(str(tmp_path))
+  assert Layer("package:myorg").resources() == [ "ORG.md", "docs/__init__.py" ]
+  assert "__init__.py" in Layer(str(templates)).resources()
+  assert Layer("package:pypi_template").resources() == sorted(walk())
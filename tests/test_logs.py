@@ -0,0 +1,37 @@
+import logging
+
+import pytest
+
+from pypi_template.logs import Recorder, sink
+
+class Collector(logging.Handler):
+  messages = []
+
+  def emit(self, record):
+    self.messages.append(record.getMessage())
+
+def test_recorder_keeps_most_recent_records():
+  recorder = Recorder(capacity=3)
+  log = logging.getLogger("test_logs")
+  log.addHandler(recorder)
+  log.setLevel(logging.INFO)
+  try:
+    for index in range(5):
+      log.info(f"message {index}")
+  finally:
+    log.removeHandler(recorder)
+  assert [ record["msg"] for record in recorder.records ] == [
+    "message 2", "message 3", "message 4"
+  ]
+  assert recorder.dropped == 2
+  assert recorder.records[0]["levelname"] == "INFO"
+  recorder.clear()
+  assert recorder.records == []
+  assert recorder.dropped == 0
+
+def test_sink_is_loaded_from_environment(monkeypatch):
+  assert sink() is None
+  monkeypatch.setenv("PYPI_TEMPLATE_LOG_SINK", "tests.test_logs:Collector")
+  assert isinstance(sink(), Collector)
+  with pytest.raises(ValueError):
+    sink("Collector")
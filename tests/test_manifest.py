@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pypi_template.manifest
+from pypi_template import PyPiTemplate
+from pypi_template.manifest import build, load, walk
+
+def test_shipped_manifest_is_up_to_date():
+  # if this fails, run `make manifest`
+  assert load() == build()
+
+def test_manifest_lists_all_templates():
+  assert sorted(t["resource"] for t in load()["templates"]) == sorted(walk())
+
+def test_manifest_maps_dot_names():
+  names = [ t["name"] for t in load()["templates"] ]
+  assert ".github/README.md" in names
+  assert not [ name for name in names if "(dot)" in name ]
+
+def test_startup_does_not_walk_templates(monkeypatch):
+  def fail(*args, **kwargs):
+    raise AssertionError("templates were walked")
+  monkeypatch.setattr(pypi_template.manifest, "walk", fail)
+  assert "package_name" in PyPiTemplate().variables
+
+def test_variables_without_manifest_are_the_same(monkeypatch):
+  with_manifest = PyPiTemplate().variables
+  monkeypatch.setattr(pypi_template.manifest, "load", lambda: None)
+  assert PyPiTemplate().variables == with_manifest
+
+def test_stale_manifest_is_detected(tmp_path):
+  import shutil
+  import time
+  from pypi_template.manifest import stale
+  templates = tmp_path / "templates"
+  shutil.copytree(
+    Path(pypi_template.manifest.__file__).parent / "templates", templates,
+    ignore=shutil.ignore_patterns("__pycache__")
+  )
+  manifest = build()
+  since    = time.time()
+  assert not stale(manifest, templates, since - 3600)
+  (templates / "Makefile").write_text("{{ new_variable }}\n")
+  assert stale(manifest, templates, since - 3600)
+  assert not stale(manifest, templates, time.time() + 1)  # not modified since
+  (templates / "NEW.md").write_text("new\n")
+  assert stale(manifest, templates, time.time() + 1)
+
+def test_stale_manifest_is_not_used(monkeypatch):
+  monkeypatch.setattr(pypi_template.manifest, "stale", lambda *args: True)
+  assert load() is None
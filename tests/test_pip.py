@@ -0,0 +1,85 @@
+import pytest
+
+from pypi_template import PyPiTemplate
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+  (tmp_path / ".pypi-template").write_text("""
+requires:
+- jinja2
+- requests<2
+- rich==13.0.0
+- not a requirement !
+test_requires:
+- Rich>=13
+- pytest>=8
+""")
+  monkeypatch.chdir(tmp_path)
+  return tmp_path
+
+def test_outdated(project, pypi_index):
+  pypi_index.add("jinja2", "3.1.6")
+  pypi_index.add("requests", "1.0", "2.32.0")
+  pypi_index.add("rich", "13.0.0", "14.0.0")
+  pypi_index.add("pytest", "8.0.0")
+  assert PyPiTemplate().pip.outdated() == [
+    { "scope" : "requires",      "package" : "requests", "current" : "<2",
+      "latest" : "2.32.0" },
+    { "scope" : "requires",      "package" : "rich",     "current" : "==13.0.0",
+      "latest" : "14.0.0" }
+  ]
+  # each package is looked up only once
+  assert sorted(pypi_index.requests) == [
+    "/pypi/jinja2/json", "/pypi/pytest/json", "/pypi/requests/json",
+    "/pypi/rich/json"
+  ]
+
+def test_outdated_ignores_unknown_packages(project, pypi_index):
+  pypi_index.add("rich", "14.0.0")
+  assert PyPiTemplate().pip.outdated() == [
+    { "scope" : "requires", "package" : "rich", "current" : "==13.0.0",
+      "latest" : "14.0.0" }
+  ]
+
+@pytest.fixture
+def applied(monkeypatch):
+  calls = []
+  monkeypatch.setattr(PyPiTemplate, "apply", lambda self: calls.append("apply"))
+  monkeypatch.setattr(
+    PyPiTemplate, "_sync_environments", lambda self: calls.append("sync")
+  )
+  return calls
+
+def test_install_many_packages_at_once(project, applied):
+  template = PyPiTemplate()
+  template.pip.install("pyyaml", "RICH>=14", "jinja2")
+  assert template["requires"] == [
+    "jinja2", "requests<2", "RICH>=14", "not a requirement !", "pyyaml"
+  ]
+  assert applied == [ "apply", "sync" ]
+
+def test_uninstall_matches_canonical_names(project, applied):
+  template = PyPiTemplate()
+  template.pip.uninstall("Jinja2", "Requests", "unknown", scope="test")
+  template.pip.uninstall("Jinja2", "Requests")
+  assert template["requires"] == [ "rich==13.0.0", "not a requirement !" ]
+  assert applied == [ "apply", "sync" ]
+
+def test_batch_applies_once(project, applied):
+  template = PyPiTemplate()
+  template.pip.batch() \
+              .install("pyyaml") \
+              .uninstall("jinja2") \
+              .install("pytest-cov", scope="test")
+  assert applied == []
+  template.pip.commit()
+  assert template["requires"] == [
+    "requests<2", "rich==13.0.0", "not a requirement !", "pyyaml"
+  ]
+  assert template["test_requires"] == [ "Rich>=13", "pytest>=8", "pytest-cov" ]
+  assert applied == [ "apply", "sync" ]
+
+def test_nothing_to_commit(project, applied):
+  template = PyPiTemplate()
+  template.pip.batch().install("jinja2").commit()
+  assert applied == []
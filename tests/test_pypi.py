@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+
+from pypi_template import PyPiTemplate, __version__
+from pypi_template.pypi import PyPI, Offline
+
+from benchmarks.pypi_index import Index
+
+def test_packages_are_looked_up_by_canonical_name(pypi_index):
+  pypi_index.add("zope-interface", "6.0")
+  assert PyPI().latest_version("Zope.Interface") == "6.0"
+  assert PyPI().latest_version("zope_interface") == "6.0"
+
+def test_metadata_is_cached(pypi_index):
+  pypi_index.add("pypi-template", "1.0.0", "1.5.1")
+  assert PyPI().latest_version("pypi-template") == "1.5.1"
+  assert PyPI().latest_version("PyPI_Template") == "1.5.1"
+  assert len(pypi_index.requests) == 1
+
+def test_stale_metadata_is_revalidated(pypi_index):
+  pypi_index.add("pypi-template", "1.5.1")
+  assert PyPI(ttl=0).latest_version("pypi-template") == "1.5.1"
+  pypi_index.add("pypi-template", "1.5.1", "2.0.0")
+  assert PyPI(ttl=0).latest_version("pypi-template") == "2.0.0"
+  pypi_index.add("pypi-template", "1.5.1", "2.0.0")
+  assert PyPI(ttl=0).latest_version("pypi-template") == "2.0.0"
+  assert len(pypi_index.requests) == 3
+
+def test_offline_only_uses_cache(pypi_index):
+  pypi_index.add("pypi-template", "1.5.1")
+  with pytest.raises(Offline):
+    PyPI(offline=True).latest_version("pypi-template")
+  PyPI().latest_version("pypi-template")
+  assert PyPI(offline=True, ttl=0).latest_version("pypi-template") == "1.5.1"
+  assert len(pypi_index.requests) == 1
+
+def test_unreachable_index_falls_back_to_cache(pypi_index):
+  pypi_index.add("pypi-template", "1.5.1")
+  PyPI().latest_version("pypi-template")
+  pypi_index.stop()
+  assert PyPI(ttl=0, timeout=1).latest_version("pypi-template") == "1.5.1"
+  with pytest.raises(Offline):
+    PyPI(ttl=0, timeout=1).latest_version("unknown")
+
+def test_metadata_is_cached_per_index(pypi_index):
+  pypi_index.add("pypi-template", "1.5.1")
+  mirror = Index().start()
+  try:
+    mirror.add("pypi-template", "1.5.1", "9.0.0")
+    assert PyPI().latest_version("pypi-template") == "1.5.1"
+    assert PyPI(index=mirror.url).latest_version("pypi-template") == "9.0.0"
+    assert mirror.requests == [ "/pypi/pypi-template/json" ]
+  finally:
+    mirror.stop()
+
+def test_status_reports_newer_version(pypi_index, caplog):
+  pypi_index.add("pypi-template", __version__, "99.0.0")
+  with caplog.at_level(logging.WARNING):
+    PyPiTemplate().status()
+  assert "a newer version of pypi-template (99.0.0)" in caplog.text
+
+def test_status_offline_is_explicit(pypi_index, caplog):
+  with caplog.at_level(logging.WARNING):
+    PyPiTemplate().offline().status()
+  assert "can't check for a newer version" in caplog.text
+  assert pypi_index.requests == []
@@ -0,0 +1,112 @@
+import pytest
+
+from pypi_template import PyPiTemplate
+from pypi_template.skip import SkipMatcher, matcher
+
+FILES = [
+  "(package_module_name)/__init__.py",
+  ".github/README.md",
+  ".github/workflows/test.yaml",
+  "MANIFEST.in",
+  "Makefile",
+  "docs/Makefile",
+  "docs/_static/.gitignore",
+  "docs/index.md",
+  "docs/conf.py",
+  "tests/test_example.py",
+  "tox.ini"
+]
+
+def kept(entries):
+  skip = SkipMatcher(entries)
+  return [ filename for filename in FILES if not skip.file(filename) ]
+
+@pytest.mark.parametrize("entries, expected", [
+  ([], FILES),
+  ([ "docs" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "MANIFEST.in", "Makefile",
+    "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "MANIFEST.in", "tests" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "Makefile", "docs/Makefile",
+    "docs/_static/.gitignore", "docs/index.md", "docs/conf.py", "tox.ini"
+  ]),
+  ([ "**/Makefile" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "MANIFEST.in", "docs/_static/.gitignore",
+    "docs/index.md", "docs/conf.py", "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "/Makefile" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "MANIFEST.in", "docs/Makefile",
+    "docs/_static/.gitignore", "docs/index.md", "docs/conf.py",
+    "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "*.md", "!docs/index.md" ], [
+    "(package_module_name)/__init__.py", ".github/workflows/test.yaml",
+    "MANIFEST.in", "Makefile", "docs/Makefile", "docs/_static/.gitignore",
+    "docs/index.md", "docs/conf.py", "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "docs/*", "!docs/*.py" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "MANIFEST.in", "Makefile", "docs/conf.py",
+    "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "docs/", "!docs/conf.py" ], [
+    "(package_module_name)/__init__.py", ".github/README.md",
+    ".github/workflows/test.yaml", "MANIFEST.in", "Makefile",
+    "tests/test_example.py", "tox.ini"
+  ]),
+  ([ ".github/**", "# a comment", "", "t?x.ini" ], [
+    "(package_module_name)/__init__.py", "MANIFEST.in", "Makefile",
+    "docs/Makefile", "docs/_static/.gitignore", "docs/index.md",
+    "docs/conf.py", "tests/test_example.py"
+  ]),
+  ([ "**/_static/", "[(]package_module_name[)]", "[!a-z]*.ini" ], [
+    ".github/README.md", ".github/workflows/test.yaml", "MANIFEST.in",
+    "Makefile", "docs/Makefile", "docs/index.md", "docs/conf.py",
+    "tests/test_example.py", "tox.ini"
+  ]),
+  ([ "docs/**/*.md", "*.yaml" ], [
+    "(package_module_name)/__init__.py", ".github/README.md", "MANIFEST.in",
+    "Makefile", "docs/Makefile", "docs/_static/.gitignore", "docs/conf.py",
+    "tests/test_example.py", "tox.ini"
+  ])
+])
+def test_skip_entries(entries, expected):
+  assert kept(entries) == expected
+
+@pytest.mark.parametrize("entry, skipped", [
+  ("Makefile",      [ "Makefile" ]),
+  (".gitignore",    []),
+  ("conf.py",       []),
+  ("docs/conf.py",  [ "docs/conf.py" ]),
+  ("docs/_static",  [ "docs/_static/.gitignore" ]),
+  ("docs",          [ "docs/Makefile", "docs/_static/.gitignore", "docs/index.md",
+                      "docs/conf.py" ])
+])
+def test_plain_entries_are_relative_to_the_root(entry, skipped):
+  # as they were before glob support
+  assert sorted(set(FILES) - set(kept([ entry ]))) == sorted(skipped)
+
+def test_skipping_entry_is_reported():
+  skip = SkipMatcher([ "docs", "*.md" ])
+  assert skip.folder("docs/_static") == "docs"
+  assert skip.file("docs/index.md") == "docs"
+  assert skip.file(".github/README.md") == "*.md"
+  assert skip.folder(".github") is None
+
+def test_matchers_are_compiled_once():
+  assert matcher([ "docs", "tests" ]) is matcher([ "docs", "tests" ])
+  assert matcher(None) is matcher([])
+
+def test_skipped_files_are_not_rendered(tmp_path, monkeypatch):
+  monkeypatch.chdir(tmp_path)
+  template = PyPiTemplate()
+  template._template_vars = { "skip" : [ "docs/", "!docs/index.md", "*.ini" ] }
+  changed = list(template._changed_files())
+  assert "tox.ini" not in changed
+  assert not any(filename.startswith("docs/") for filename in changed)
+  assert "Makefile" in changed
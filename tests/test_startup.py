@@ -0,0 +1,37 @@
+import sys
+import json
+import subprocess
+
+HEAVY = [ "jinja2", "yaml", "prompt_toolkit", "colorama", "requests", "rich" ]
+
+def imported_modules(command):
+  # run a command in a fresh interpreter and report which heavy modules it
+  # pulled in
+  script = "\n".join([
+    "import sys, json",
+    "from pypi_template import PyPiTemplate",
+    f"PyPiTemplate().{command}",
+    f"print(json.dumps([ m for m in {HEAVY!r} if m in sys.modules ]))"
+  ])
+  result = subprocess.run(
+    [ sys.executable, "-c", script ], capture_output=True, text=True, check=True
+  )
+  return json.loads(result.stdout)
+
+def test_version_imports_no_heavy_modules():
+  assert imported_modules("version") == []
+
+def test_variables_at_most_imports_template_engine_and_yaml():
+  assert set(imported_modules("variables")) <= { "jinja2", "yaml" }
+
+def test_importing_does_not_configure_logging():
+  script = "\n".join([
+    "import logging",
+    "import pypi_template",
+    "import pypi_template.__main__",
+    "print(len(logging.getLogger().handlers))"
+  ])
+  result = subprocess.run(
+    [ sys.executable, "-c", script ], capture_output=True, text=True, check=True
+  )
+  assert result.stdout.strip() == "0"
@@ -0,0 +1,46 @@
+import jinja2
+import pytest
+
+from pypi_template import PyPiTemplate
+
+def temporary_files(root):
+  return [ path for path in root.rglob("*.tmp") ]
+
+def test_apply_streams_without_rendering_full_strings(project, monkeypatch):
+  def fail(*args, **kwargs):
+    raise AssertionError("template was rendered to a string")
+  monkeypatch.setattr(jinja2.Template, "render", fail)
+  PyPiTemplate().apply()
+  assert (project / "setup.py").is_file()
+  assert (project / ".github" / "workflows" / "test.yaml").is_file()
+  assert temporary_files(project) == []
+
+def test_unchanged_files_are_not_replaced(project):
+  PyPiTemplate().apply()
+  before = (project / "setup.py").stat().st_mtime_ns
+  PyPiTemplate().force().apply()
+  assert (project / "setup.py").stat().st_mtime_ns == before
+  assert not (project / "setup.py.backup").exists()
+  assert temporary_files(project) == []
+
+def test_changed_files_are_backed_up_and_replaced(project):
+  PyPiTemplate().apply()
+  (project / "Makefile").write_text("changed\n")
+  PyPiTemplate().apply()
+  assert (project / "Makefile.backup").read_text() == "changed\n"
+  assert (project / "Makefile").read_text() != "changed\n"
+  assert temporary_files(project) == []
+
+def test_debug_writes_nothing(project):
+  PyPiTemplate().debug().apply()
+  assert sorted(path.name for path in project.iterdir()) == [ ".pypi-template", "cache" ]
+
+def test_failing_template_leaves_no_temporary_files(project):
+  layer = project / "layer"
+  layer.mkdir()
+  (layer / "(dot)env").write_text("{{ 1 // 0 }}\n")
+  with open(project / ".pypi-template", "a") as fp:
+    fp.write(f"layers:\n- {layer}\n")
+  with pytest.raises(ZeroDivisionError):
+    PyPiTemplate().apply()
+  assert temporary_files(project) == []
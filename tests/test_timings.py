@@ -0,0 +1,35 @@
+import json
+import pstats
+
+from pypi_template import PyPiTemplate
+from pypi_template.timings import Timings
+
+def test_timings_accumulate_per_phase_and_template():
+  timings = Timings()
+  for _ in range(2):
+    with timings.measure("render", "setup.py") as sample:
+      sample["bytes"] = 10
+  with timings.measure("load-config"):
+    pass
+  report = timings.report()
+  assert report["phases"]["render"]["calls"] == 2
+  assert report["phases"]["render"]["bytes"] == 20
+  assert report["templates"]["setup.py"]["render"]["bytes"] == 20
+  assert "load-config" not in report["templates"]
+
+def test_apply_with_timings(project, capsys):
+  template = PyPiTemplate().timings(profile=str(project / "apply.pstats"))
+  template.apply()
+  template._report_timings()
+  report = json.loads(capsys.readouterr().err)
+  for phase in [ "load-config", "compile", "render", "compare", "write" ]:
+    assert phase in report["phases"]
+  setup = report["templates"]["setup.py"]
+  assert setup["render"]["bytes"] == (project / "setup.py").stat().st_size
+  assert pstats.Stats(report["profile"]).total_calls > 0
+
+def test_no_timings_by_default(capsys):
+  template = PyPiTemplate()
+  assert template.variables
+  template._report_timings()
+  assert capsys.readouterr().err == ""
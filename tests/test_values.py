@@ -16,6 +16,7 @@ def test_variables():
     "github_account",
     "github_repo_name",
     "keywords_describing_the_package",
+    "layers",
     "license",
     "package_module_name",
     "package_name",
@@ -0,0 +1,96 @@
+import threading
+import logging
+import sys
+import time
+
+import pytest
+
+from pypi_template import PyPiTemplate
+from pypi_template.watch import Inotify, Poller, inputs as project_inputs
+
+from tests.projects import write_config
+
+WATCHERS = [ lambda files, folders: Poller(files, folders, interval=0.01) ]
+if sys.platform.startswith("linux"):
+  WATCHERS.append(Inotify)
+
+@pytest.fixture
+def inputs(tmp_path):
+  (tmp_path / "layer" / "sub").mkdir(parents=True)
+  (tmp_path / "layer" / "sub" / "file.txt").write_text("one")
+  (tmp_path / "config").write_text("one")
+  return [ str(tmp_path / "config"), str(tmp_path / "missing" / "file") ], \
+         [ str(tmp_path / "layer") ]
+
+@pytest.mark.parametrize("make", WATCHERS)
+def test_watchers_report_changed_inputs(make, inputs, tmp_path):
+  with make(*inputs) as watcher:
+    assert watcher.wait(0.05) == set()
+    (tmp_path / "unrelated").write_text("ignored")
+    (tmp_path / "config").write_text("two, longer")
+    assert watcher.changes(0.05) == { str(tmp_path / "config") }
+    (tmp_path / "layer" / "sub" / "new.txt").write_text("new")
+    (tmp_path / "layer" / "sub" / "file.txt").unlink()
+    assert watcher.changes(0.05) == {
+      str(tmp_path / "layer" / "sub" / "new.txt"),
+      str(tmp_path / "layer" / "sub" / "file.txt")
+    }
+    (tmp_path / "missing").mkdir()
+    (tmp_path / "missing" / "file").write_text("created")
+    assert watcher.changes(0.05) == { str(tmp_path / "missing" / "file") }
+
+@pytest.mark.parametrize("make", WATCHERS)
+def test_watchers_ignore_settled_files(make, inputs, tmp_path):
+  with make(*inputs) as watcher:
+    (tmp_path / "config").write_text("written while applying")
+    watcher.settle([ str(tmp_path / "config") ])
+    (tmp_path / "layer" / "sub" / "file.txt").write_text("two")
+    assert watcher.changes(0.05) == { str(tmp_path / "layer" / "sub" / "file.txt") }
+    (tmp_path / "config").write_text("edited")
+    assert watcher.changes(0.05) == { str(tmp_path / "config") }
+
+@pytest.mark.parametrize("interval", [ None, 0.01 ])
+def test_watch_rerenders_affected_files(project, interval):
+  (project / "docs").mkdir()
+  (project / "docs" / "summary.md").write_text("first summary\n")
+  before = {}
+  def edit():
+    while not (project / "setup.py").exists():
+      time.sleep(0.01)
+    time.sleep(0.2)
+    before["setup.py"] = (project / "setup.py").stat().st_mtime_ns
+    (project / "docs" / "summary.md").write_text("second summary\n")
+  editor = threading.Thread(target=edit)
+  editor.start()
+  PyPiTemplate().watch(debounce=0.05, interval=interval, limit=1)
+  editor.join()
+  assert "second summary" in (project / ".github" / "README.md").read_text()
+  assert (project / "setup.py").stat().st_mtime_ns == before["setup.py"]
+
+def test_inputs_are_relative_to_the_project_root(tmp_path, monkeypatch):
+  monkeypatch.chdir(tmp_path)
+  root = write_config(tmp_path / "project")
+  files, _ = project_inputs(PyPiTemplate(root=str(root)))
+  assert str(root / ".pypi-template") in files
+  assert str(root / "docs" / "summary.md") in files
+
+@pytest.mark.parametrize("interval", [ None, 0.01 ])
+def test_force_watch_does_not_trigger_itself(project, interval, caplog, monkeypatch):
+  caplog.set_level(logging.INFO)
+  monkeypatch.setattr(sys, "argv", [ "pypi-template", "force", "watch" ])
+  (project / "docs").mkdir()
+  (project / "docs" / "summary.md").write_text("first summary\n")
+  def edit():
+    while not (project / "setup.py").exists():
+      time.sleep(0.01)
+    time.sleep(0.3)
+    (project / "docs" / "summary.md").write_text("second summary\n")
+  editor = threading.Thread(target=edit)
+  editor.start()
+  template = PyPiTemplate()
+  assert template._force
+  template.watch(debounce=0.05, interval=interval, limit=1)
+  editor.join()
+  changed = [ record.msg for record in caplog.records if "🔄" in record.msg ]
+  assert changed == [ "🔄 docs/summary.md changed" ]
+  assert not template._fresh()._force
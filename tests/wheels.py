@@ -0,0 +1,40 @@
+"""
+Minimal, pure Python wheels, to install into environments without a network.
+"""
+
+import zipfile
+import hashlib
+import base64
+
+def wheel(folder, name, version, requires=()):
+  """
+  Builds a wheel for a package with a single module and returns its path.
+  """
+  module   = name.replace("-", "_")
+  info     = f"{module}-{version}.dist-info"
+  metadata = "\n".join([
+    "Metadata-Version: 2.1",
+    f"Name: {name}",
+    f"Version: {version}",
+    *[ f"Requires-Dist: {requirement}" for requirement in requires ]
+  ]) + "\n"
+  files = {
+    f"{module}.py"      : f"VERSION = {version!r}\n",
+    f"{info}/METADATA"  : metadata,
+    f"{info}/WHEEL"     : "Wheel-Version: 1.0\nGenerator: tests\n"
+                          "Root-Is-Purelib: true\nTag: py3-none-any\n"
+  }
+  record = [
+    f"{path},sha256={_digest(content)},{len(content.encode())}"
+    for path, content in files.items()
+  ] + [ f"{info}/RECORD,," ]
+  files[f"{info}/RECORD"] = "\n".join(record) + "\n"
+  path = folder / f"{module}-{version}-py3-none-any.whl"
+  with zipfile.ZipFile(path, "w") as archive:
+    for filename, content in files.items():
+      archive.writestr(filename, content)
+  return path
+
+def _digest(content):
+  raw = hashlib.sha256(content.encode()).digest()
+  return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()